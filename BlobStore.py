@@ -0,0 +1,225 @@
+from typing import Dict, List, Any, Optional, Set, Tuple
+from collections import OrderedDict
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+
+
+################################################################################
+##
+## Content-addressed storage for attached documents.
+##
+## A document attached with /f is written once to `saved_sessions/blobs/`, named
+## by the sha256 of its content, and the conversation history keeps only a
+## reference in place of the base64 payload:
+##
+##     {"document": {"name": ..., "format": ..., "source": {"blobRef": <sha256>, "size": <bytes>}}}
+##
+## Session journals therefore never contain document bodies. inline_documents()
+## builds the messages actually sent to Converse: documents from the most recent
+## turns get their payload back, older ones are replaced by a short note.
+
+BLOBS_DIR = os.path.join("saved_sessions", "blobs")
+BLOB_CACHE_BYTES = 64 * 1024 * 1024
+
+# Documents from this many of the latest user turns are sent in full.
+DOCUMENT_KEEP_TURNS = int(os.environ.get("SBCT_DOCUMENT_KEEP_TURNS", "3"))
+# Converse accepts at most five documents per request.
+MAX_REQUEST_DOCUMENTS = 5
+
+
+class BlobStore:
+    def __init__(self, directory: str = BLOBS_DIR, cache_bytes: int = BLOB_CACHE_BYTES):
+        """
+        Args:
+            directory (str): Where blobs are stored, one file per content hash.
+            cache_bytes (int): Base64 text kept in memory for recently used blobs.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()  # sha256 -> base64 text
+        self._cached_size = 0
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self._path(digest))
+
+    def size(self, digest: str) -> int:
+        return os.path.getsize(self._path(digest))
+
+    def temp_file(self):
+        """
+        Open a new file in the store for the raw bytes of a blob whose digest is
+        not known until it is written; hand it to put_file() once it is closed.
+        """
+        return tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False)
+
+    def put_file(self, tmp_path: str, digest: str, encoded: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Move a file written through temp_file() into the store and return
+        (digest, size). The file is removed instead if the blob already exists.
+
+        Args:
+            tmp_path (str): The name of the temporary file.
+            digest (str): The sha256 of its content, computed while writing it.
+            encoded (str, optional): The content as base64, to keep in memory.
+        """
+        size = os.path.getsize(tmp_path)
+        path = self._path(digest)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        if encoded is not None:
+            self.remember(digest, encoded)
+        return digest, size
+
+    def put_base64(self, encoded: str, digest: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Store base64 content and return (sha256 of the decoded bytes, decoded size).
+
+        Args:
+            encoded (str): The base64 text, as carried in a document source.
+            digest (str, optional): The sha256, when the caller has already computed it.
+        """
+        data = base64.b64decode(encoded)
+        digest = digest or hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self.remember(digest, encoded)
+        return digest, len(data)
+
+    def get_base64(self, digest: str) -> Optional[str]:
+        """Return a blob as base64 text, or None if it is not in the store."""
+        with self._lock:
+            encoded = self._cache.get(digest)
+            if encoded is not None:
+                self._cache.move_to_end(digest)
+                return encoded
+        try:
+            with open(self._path(digest), "rb") as f:
+                encoded = base64.b64encode(f.read()).decode("ascii")
+        except FileNotFoundError:
+            return None
+        self.remember(digest, encoded)
+        return encoded
+
+    def remember(self, digest: str, encoded: str) -> None:
+        """Keep the base64 text of a stored blob in memory, sharing the caller's string."""
+        with self._lock:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return
+            self._cache[digest] = encoded
+            self._cached_size += len(encoded)
+            while self._cached_size > self.cache_bytes and len(self._cache) > 1:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_size -= len(evicted)
+
+
+def document_reference(document: Dict[str, Any], digest: str, size: int) -> Dict[str, Any]:
+    """A copy of a document block's body with its payload replaced by a blob reference."""
+    return dict(document, source={"blobRef": digest, "size": size})
+
+
+def externalize_documents(conversation_history: List[Dict[str, Any]], store: BlobStore) -> List[Dict[str, Any]]:
+    """
+    Move inline document payloads (e.g. in sessions saved before the blob store)
+    into `store`. Returns the same list if there were none, otherwise a new list.
+    """
+    changed = False
+    externalized = []
+    for message in conversation_history:
+        content = message.get("content", [])
+        if any("bytes" in block.get("document", {}).get("source", {}) for block in content):
+            new_content = []
+            for block in content:
+                source = block.get("document", {}).get("source", {})
+                if "bytes" in source:
+                    encoded = source["bytes"]
+                    if isinstance(encoded, (bytes, bytearray)):
+                        encoded = base64.b64encode(encoded).decode("ascii")
+                    digest, size = store.put_base64(encoded)
+                    block = {"document": document_reference(block["document"], digest, size)}
+                new_content.append(block)
+            message = dict(message, content=new_content)
+            changed = True
+        externalized.append(message)
+    return externalized if changed else conversation_history
+
+
+def document_note(document: Dict[str, Any]) -> Dict[str, Any]:
+    """The text block sent in place of a document that is no longer included."""
+    return {"text": f"[Document '{document.get('name', '')}' was attached earlier and is not included any more.]"}
+
+
+def sent_documents(conversation_history: List[Dict[str, Any]],
+                   keep_turns: int = DOCUMENT_KEEP_TURNS,
+                   max_documents: int = MAX_REQUEST_DOCUMENTS) -> Set[Tuple[int, int]]:
+    """
+    The (message position, block position) of the documents sent in full: those
+    from the latest `keep_turns` user turns, at most `max_documents`, newest
+    first. Every other document is sent as a document_note(). The history
+    budget (HistoryManager) counts documents by the same rule.
+    """
+    sent = set()
+    turns_seen = 0
+    for position in range(len(conversation_history) - 1, -1, -1):
+        message = conversation_history[position]
+        content = message.get("content", [])
+        if message.get("role") == "user" and any("text" in block for block in content):
+            turns_seen += 1
+        if turns_seen > keep_turns:
+            break
+        for index, block in enumerate(content):
+            if "document" in block and len(sent) < max_documents:
+                sent.add((position, index))
+    return sent
+
+
+def inline_documents(conversation_history: List[Dict[str, Any]], store: BlobStore,
+                     keep_turns: int = DOCUMENT_KEEP_TURNS,
+                     max_documents: int = MAX_REQUEST_DOCUMENTS) -> List[Dict[str, Any]]:
+    """
+    Build the messages to send: the documents chosen by sent_documents() get
+    their payload inlined; older documents become a text note. Messages without
+    documents are reused as is.
+    """
+    if not any("document" in block for message in conversation_history for block in message.get("content", [])):
+        return conversation_history
+
+    sent = sent_documents(conversation_history, keep_turns, max_documents)
+    messages = list(conversation_history)
+    for position, message in enumerate(messages):
+        content = message.get("content", [])
+        if not any("document" in block for block in content):
+            continue
+
+        new_content = []
+        for index, block in enumerate(content):
+            document = block.get("document")
+            if document is None:
+                new_content.append(block)
+                continue
+            source = document.get("source", {})
+            payload = None
+            if (position, index) in sent:
+                payload = source["bytes"] if "bytes" in source else store.get_base64(source.get("blobRef", ""))
+            if payload is not None:
+                new_content.append({"document": dict(document, source={"bytes": payload})})
+            else:
+                new_content.append(document_note(document))
+        messages[position] = dict(message, content=new_content)
+    return messages
@@ -0,0 +1,214 @@
+from typing import Dict, List, Any, Optional
+from datetime import datetime, timedelta
+from functools import lru_cache
+import re
+
+
+################################################################################
+## Natural-language parsing
+##
+## dateparser costs tens of milliseconds per call (and much more on the first
+## one), and agents ask for the same few phrases over and over. parse_datetime()
+## therefore:
+##
+##   - answers ISO-8601 strings and the common relative phrases ("now",
+##     "tomorrow 9am", "in 2 hours", "3 days ago") itself, with the same results
+##     dateparser gives for them, and only falls back to dateparser otherwise;
+##   - memoizes results on (phrase, reference time, timezone). The reference
+##     time is the current minute, so a cached "in 2 hours" is reused for at most
+##     a minute and never goes stale.
+##
+## Without a timezone, results are naive local times, as dateparser returns them.
+
+PARSE_CACHE_SIZE = 1024
+
+_TIME = r"(?P<hour>\d{1,2})(?:(?::(?P<minute>\d{2}))\s*(?P<ampm>am|pm)?|\s*(?P<ampm_only>am|pm))"
+_DAY_TIME_RE = re.compile(r"^(?P<day>now|today|tomorrow|yesterday)(?:\s+(?:at\s+)?" + _TIME + r")?$")
+_TIME_ONLY_RE = re.compile(r"^(?:at\s+)?" + _TIME + r"$")
+_IN_RE = re.compile(r"^in\s+(?P<count>\d+)\s+(?P<unit>minute|hour|day|week)s?$")
+_AGO_RE = re.compile(r"^(?P<count>\d+)\s+(?P<unit>minute|hour|day|week)s?\s+ago$")
+
+_DAY_OFFSETS = {"now": 0, "today": 0, "tomorrow": 1, "yesterday": -1}
+_UNITS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1),
+          "day": timedelta(days=1), "week": timedelta(weeks=1)}
+
+
+def _time_of_day(match) -> Optional[tuple]:
+    hour = int(match.group("hour"))
+    minute = int(match.group("minute") or 0)
+    ampm = match.group("ampm") or match.group("ampm_only")
+    if ampm:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if ampm == "pm" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+def _parse_iso(text: str) -> Optional[datetime]:
+    if not (len(text) >= 10 and text[4] == "-" and text[:4].isdigit()):
+        return None
+    if text[-1:] in ("z", "Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def _parse_fast(text: str, base: datetime) -> Optional[datetime]:
+    """Parse the phrases we recognise ourselves; None means 'ask dateparser'."""
+    parsed = _parse_iso(text)
+    if parsed is not None:
+        return parsed
+
+    match = _DAY_TIME_RE.match(text) or _TIME_ONLY_RE.match(text)
+    if match:
+        day = match.groupdict().get("day") or "today"
+        result = base + timedelta(days=_DAY_OFFSETS[day])
+        if match.group("hour") is None:
+            return result
+        if day == "now":
+            return None
+        time_of_day = _time_of_day(match)
+        if time_of_day is None:
+            return None
+        return result.replace(hour=time_of_day[0], minute=time_of_day[1], second=0, microsecond=0)
+
+    match = _IN_RE.match(text)
+    if match:
+        return base + int(match.group("count")) * _UNITS[match.group("unit")]
+    match = _AGO_RE.match(text)
+    if match:
+        return base - int(match.group("count")) * _UNITS[match.group("unit")]
+    return None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_cached(text: str, base: datetime, timezone: Optional[str]) -> Optional[datetime]:
+    parsed = _parse_fast(text, base)
+    if parsed is None:
+        import dateparser
+        settings = {"RELATIVE_BASE": base}
+        if timezone:
+            settings.update({"TIMEZONE": timezone, "RETURN_AS_TIMEZONE_AWARE": True})
+        return dateparser.parse(text, settings=settings)
+
+    if timezone:
+        import pytz
+        tz = pytz.timezone(timezone)
+        parsed = tz.localize(parsed) if parsed.tzinfo is None else parsed.astimezone(tz)
+    return parsed
+
+
+def _now(timezone: Optional[str]) -> datetime:
+    if not timezone:
+        return datetime.now()
+    import pytz
+    return datetime.now(pytz.timezone(timezone)).replace(tzinfo=None)
+
+
+def parse_datetime(text: str, timezone: Optional[str] = None, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Parse a date/time phrase such as "tomorrow 9am" or "2024-05-01T10:00:00Z".
+
+    Args:
+        text (str): The phrase to parse.
+        timezone (str, optional): An IANA zone (e.g. "US/Pacific") that relative
+            phrases and times without an offset are taken in. Defaults to local time.
+        now (datetime, optional): The reference time for relative phrases, as a
+            naive time in `timezone`. Defaults to the current time.
+
+    Returns:
+        datetime: The parsed time, or None if the phrase is not understood.
+    """
+    if now is None:
+        now = _now(timezone)
+    base = now.replace(second=0, microsecond=0)
+    return _parse_cached(" ".join(text.lower().split()), base, timezone)
+
+
+def parse_datetimes(texts: List[str], timezone: Optional[str] = None,
+                    now: Optional[datetime] = None) -> List[Optional[datetime]]:
+    """Parse several phrases against the same reference time; see parse_datetime."""
+    if now is None:
+        now = _now(timezone)
+    return [parse_datetime(text, timezone, now) for text in texts]
+
+
+def parse_cache_info():
+    """Hit/miss statistics of the phrase cache."""
+    return _parse_cached.cache_info()
+
+
+################################################################################
+## Formatting epoch seconds
+##
+## format_epoch_seconds() renders timestamps exactly like
+## `datetime.fromtimestamp(s, tz).strftime(HUMAN_DATETIME_FORMAT)`, but without a
+## datetime per value. A zone's UTC offset and abbreviation are looked up once
+## per UTC hour and reused for every timestamp in that hour; the rest is integer
+## arithmetic. Hours that contain a transition are formatted the slow way.
+
+HUMAN_DATETIME_FORMAT = '%Y-%m-%d %I:%M:%S %p %Z'
+HOUR_BUCKET_CACHE_SIZE = 65536
+
+_EPOCH = datetime(1970, 1, 1)
+_CLOCK_12 = ["12"] + [f"{hour:02d}" for hour in range(1, 12)]
+
+
+@lru_cache(maxsize=None)
+def _tz(timezone: str):
+    import pytz
+    return pytz.timezone(timezone)
+
+
+@lru_cache(maxsize=HOUR_BUCKET_CACHE_SIZE)
+def _hour_bucket(timezone: str, hour: int):
+    """(offset seconds, " ABBR") for one UTC hour, or None if it has a transition."""
+    tz = _tz(timezone)
+    start = datetime.fromtimestamp(hour * 3600, tz)
+    end = datetime.fromtimestamp(hour * 3600 + 3599, tz)
+    if start.utcoffset() != end.utcoffset() or start.tzname() != end.tzname():
+        return None
+    return int(start.utcoffset().total_seconds()), " " + start.tzname()
+
+
+@lru_cache(maxsize=HOUR_BUCKET_CACHE_SIZE)
+def _day_prefix(day: int) -> str:
+    return (_EPOCH + timedelta(days=day)).strftime('%Y-%m-%d ')
+
+
+def format_epoch_seconds(values: List[int], timezone: str = 'US/Pacific') -> List[str]:
+    """
+    Format epoch seconds as HUMAN_DATETIME_FORMAT strings in `timezone`.
+
+    Args:
+        values (list of int): Seconds since the epoch (UTC).
+        timezone (str): IANA zone to render in.
+
+    Returns:
+        list of str: One string per value, e.g. '2024-05-01 03:00:00 AM PDT'.
+    """
+    formatted = []
+    append = formatted.append
+    buckets = {}  # Local memo in front of the lru_caches; most values share a few hours
+    days = {}
+    for value in values:
+        hour_key = value // 3600
+        bucket = buckets.get(hour_key)
+        if bucket is None:
+            bucket = buckets[hour_key] = _hour_bucket(timezone, hour_key) or False
+        if bucket is False:
+            append(datetime.fromtimestamp(value, _tz(timezone)).strftime(HUMAN_DATETIME_FORMAT))
+            continue
+        day, second_of_day = divmod(value + bucket[0], 86400)
+        prefix = days.get(day)
+        if prefix is None:
+            prefix = days[day] = _day_prefix(day)
+        hour, second_of_hour = divmod(second_of_day, 3600)
+        minute, second = divmod(second_of_hour, 60)
+        append(f"{prefix}{_CLOCK_12[hour % 12]}:{minute:02d}:{second:02d} "
+               f"{'AM' if hour < 12 else 'PM'}{bucket[1]}")
+    return formatted
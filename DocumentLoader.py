@@ -0,0 +1,176 @@
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
+import base64
+import hashlib
+import os
+import threading
+
+
+################################################################################
+##
+## Loading files attached with /f as Converse document blocks.
+##
+## Files are size-checked before they are read, then read in chunks that are
+## hashed and base64-encoded straight into one preallocated buffer, so the raw
+## file is never held in memory next to its encoding.
+##
+## Encodings are cached by content hash (sha256), and the hash by (path, size,
+## mtime), so attaching the same file again neither reads nor encodes it, and
+## every copy in the history shares one string.
+
+FORMAT_MAPPING = {
+    '.pdf': 'pdf',
+    '.txt': 'txt',
+    '.md': 'md',
+    '.html': 'html'
+}
+
+# Bedrock accepts documents up to 4.5 MB each.
+MAX_DOCUMENT_BYTES = int(os.environ.get("SBCT_MAX_DOCUMENT_BYTES", str(4_500_000)))
+DOCUMENT_CACHE_BYTES = 64 * 1024 * 1024
+CHUNK_SIZE = 3 * 256 * 1024  # A multiple of 3, so chunk encodings concatenate without padding
+
+
+def encode_file(path: str, max_bytes: int, chunk_size: int = CHUNK_SIZE, sink=None) -> Tuple[str, str]:
+    """
+    Read `path` in chunks, returning (sha256 hex digest, base64 text).
+
+    With `sink`, a binary file, each raw chunk is also written there as it is
+    read, e.g. to store the file without decoding the base64 text again.
+
+    Raises:
+        ValueError: If the file is larger than `max_bytes`, even if it grew while being read.
+    """
+    size = os.path.getsize(path)
+    if size > max_bytes:
+        raise ValueError(f"File too large: {size / 1e6:.1f} MB (limit {max_bytes / 1e6:.1f} MB)")
+
+    digest = hashlib.sha256()
+    encoded = bytearray(4 * ((size + 2) // 3))
+    position = 0
+    read = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            read += len(chunk)
+            if read > size:
+                raise ValueError(f"File changed while reading: {path}")
+            digest.update(chunk)
+            if sink is not None:
+                sink.write(chunk)
+            piece = base64.b64encode(chunk)
+            encoded[position:position + len(piece)] = piece
+            position += len(piece)
+    del encoded[position:]  # The file may have shrunk meanwhile
+    return digest.hexdigest(), encoded.decode('ascii')
+
+
+class DocumentLoader:
+    def __init__(self, max_document_bytes: int = MAX_DOCUMENT_BYTES, cache_bytes: int = DOCUMENT_CACHE_BYTES):
+        """
+        Args:
+            max_document_bytes (int): Files larger than this are refused.
+            cache_bytes (int): Total base64 text kept in the content-hash cache.
+        """
+        self.max_document_bytes = max_document_bytes
+        self.cache_bytes = cache_bytes
+        self._encoded = OrderedDict()  # sha256 -> base64 text, least recently used first
+        self._digests = {}  # (path, size, mtime_ns) -> sha256
+        self._cached_size = 0
+        self._lock = threading.Lock()
+
+    def load(self, file_path: str, blob_store=None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Read a file and return (document block, None), or (None, error message).
+
+        Args:
+            file_path (str): The file to attach.
+            blob_store (BlobStore, optional): Store the content there and return a
+                document whose source is a blob reference instead of the payload.
+        """
+        if not os.path.exists(file_path):
+            return None, f"File not found: {file_path}"
+
+        file_name = os.path.basename(file_path)
+        _, file_extension = os.path.splitext(file_name)
+        file_extension = file_extension.lower()
+        if file_extension not in FORMAT_MAPPING:
+            return None, f"Unsupported file format: {file_extension}"
+
+        try:
+            if blob_store is None:
+                digest, encoded_content = self.encode(file_path)
+            else:
+                digest, encoded_content, size = self.store(file_path, blob_store)
+        except (OSError, ValueError) as e:
+            return None, str(e)
+
+        document = {
+            "name": file_name,
+            "format": FORMAT_MAPPING[file_extension],
+            "source": {"bytes": encoded_content}
+        }
+        if blob_store is not None:
+            from BlobStore import document_reference
+            document = document_reference(document, digest, size)
+        return document, None
+
+    def encode(self, file_path: str) -> Tuple[str, str]:
+        """Return (sha256, base64 text) for a file, from the cache when possible."""
+        stat_key, digest, encoded_content = self._cached(file_path)
+        if encoded_content is not None:
+            return digest, encoded_content
+
+        digest, encoded_content = encode_file(file_path, self.max_document_bytes)
+        return digest, self._keep(stat_key, digest, encoded_content)
+
+    def store(self, file_path: str, blob_store) -> Tuple[str, str, int]:
+        """
+        Like encode(), but also make sure the file is in `blob_store`; returns
+        (sha256, base64 text, size). The raw chunks are written to the store
+        while the file is read, so its content is never decoded back from base64.
+        """
+        stat_key, digest, encoded_content = self._cached(file_path)
+        if encoded_content is not None and blob_store.exists(digest):
+            blob_store.remember(digest, encoded_content)
+            return digest, encoded_content, blob_store.size(digest)
+
+        with blob_store.temp_file() as blob:
+            try:
+                digest, encoded_content = encode_file(file_path, self.max_document_bytes, sink=blob)
+            except BaseException:
+                blob.close()
+                os.remove(blob.name)
+                raise
+        encoded_content = self._keep(stat_key, digest, encoded_content)
+        digest, size = blob_store.put_file(blob.name, digest, encoded_content)
+        return digest, encoded_content, size
+
+    def _cached(self, file_path: str):
+        """Return (stat key, sha256, base64 text) for a file; the last two are None if not cached."""
+        stat = os.stat(file_path)
+        stat_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(stat_key)
+            if digest is not None and digest in self._encoded:
+                self._encoded.move_to_end(digest)
+                return stat_key, digest, self._encoded[digest]
+        return stat_key, None, None
+
+    def _keep(self, stat_key, digest: str, encoded_content: str) -> str:
+        """Cache a new encoding; returns the string to use, shared with an existing copy."""
+        with self._lock:
+            self._digests[stat_key] = digest
+            if digest in self._encoded:
+                # Same content under another name or mtime: share the existing string.
+                self._encoded.move_to_end(digest)
+                return self._encoded[digest]
+            self._encoded[digest] = encoded_content
+            self._cached_size += len(encoded_content)
+            while self._cached_size > self.cache_bytes and len(self._encoded) > 1:
+                evicted_digest, evicted = self._encoded.popitem(last=False)
+                self._cached_size -= len(evicted)
+                self._digests = {key: value for key, value in self._digests.items() if value != evicted_digest}
+        return encoded_content
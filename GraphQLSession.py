@@ -0,0 +1,269 @@
+from typing import Dict, Any, Optional, AsyncIterator, Iterator
+import asyncio
+import atexit
+import hashlib
+import os
+import threading
+import time
+import requests
+from gql import Client
+from gql.transport.aiohttp import AIOHTTPTransport
+from gql.transport.exceptions import TransportQueryError, TransportServerError
+from graphql import build_client_schema, get_introspection_query, print_schema
+from Metrics import metrics
+from QueryRegistry import RegisteredQuery, error_code, PERSISTED_QUERY_NOT_FOUND, PERSISTED_QUERY_NOT_SUPPORTED
+
+
+################################################################################
+##
+## The introspected schema is cached on disk, keyed by endpoint, so startup
+## needs no introspection round-trip. A stale cache is still used straight
+## away and refreshed on a background thread for the next start.
+
+SCHEMA_CACHE_DIR = os.environ.get(
+    "BOSBCT_SCHEMA_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "bosbct")
+)
+SCHEMA_MAX_AGE_SECS = 24 * 60 * 60
+
+
+class SchemaCache:
+    def __init__(self, endpoint: str, api_key: str, cache_dir: str = SCHEMA_CACHE_DIR,
+                 max_age: float = SCHEMA_MAX_AGE_SECS):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.max_age = max_age
+        key = hashlib.sha256(endpoint.encode('utf-8')).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, f"schema-{key}.graphql")
+
+    def load(self) -> Optional[str]:
+        """Return the cached SDL, or None if nothing is cached for this endpoint."""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r") as f:
+            return f.read()
+
+    def is_stale(self) -> bool:
+        return time.time() - os.path.getmtime(self.path) > self.max_age
+
+    def save(self, sdl: str) -> None:
+        """Write the SDL atomically, so a concurrent start never reads half a file."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(sdl)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self) -> str:
+        """Introspect the endpoint, update the cache and return the new SDL."""
+        response = requests.post(
+            self.endpoint,
+            json={"query": get_introspection_query()},
+            headers={'x-api-key': self.api_key},
+            timeout=30,
+        )
+        response.raise_for_status()
+        sdl = print_schema(build_client_schema(response.json()['data']))
+        self.save(sdl)
+        return sdl
+
+    def refresh_in_background(self) -> threading.Thread:
+        def refresh_quietly():
+            try:
+                self.refresh()
+            except Exception:
+                pass  # Keep using the cached copy; we will try again next start.
+        thread = threading.Thread(target=refresh_quietly, name="schema-refresh", daemon=True)
+        thread.start()
+        return thread
+
+
+def operation_name(document) -> str:
+    """The name of the first operation in a document or gql request, e.g. "ListTasks"."""
+    if getattr(document, "operation_name", None):
+        return document.operation_name
+    document = getattr(document, "document", document)
+    for definition in getattr(document, "definitions", ()):
+        name = getattr(definition, "name", None)
+        if name is not None:
+            return name.value
+    return "anonymous"
+
+
+################################################################################
+##
+## One async gql Client and one long-lived session, shared by AsyncTask,
+## AsyncTodo and AsyncOKR. The AIOHTTP transport keeps a single aiohttp
+## ClientSession, so requests reuse pooled keep-alive connections and several
+## queries can be in flight at once.
+##
+## The sync access classes (Task, Todo, OKR) drive the same session through
+## `run()`, which executes coroutines on a private background event loop.
+##
+## Documents from QueryRegistry are validated once per schema and handed to
+## the transport directly, with their pre-printed text or, if the server
+## supports persisted queries, only their hash. Whether it does is found out
+## on the first request unless BOSBCT_PERSISTED_QUERIES is "on" or "off".
+
+PERSISTED_QUERIES = {"on": True, "off": False}.get(os.environ.get("BOSBCT_PERSISTED_QUERIES", "auto"))
+
+
+def _not_executed(result) -> bool:
+    """True if a hash-only request was refused as a whole, so it is safe to resend."""
+    errors = result.errors or []
+    if any(error_code(error) == PERSISTED_QUERY_NOT_SUPPORTED for error in errors):
+        return True
+    return bool(errors) and result.data is None and not any(error.get("path") for error in errors)
+
+class GraphQLConnection:
+    def __init__(self, endpoint: str, api_key: str, schema_file: Optional[str] = None,
+                 schema_cache: Optional[SchemaCache] = None, execute_timeout: Optional[int] = 10,
+                 persisted_queries: Optional[bool] = PERSISTED_QUERIES):
+        """
+        Args:
+            endpoint (str): The GraphQL endpoint URL.
+            api_key (str): Sent as the `x-api-key` header.
+            schema_file (str, optional): An SDL file (e.g. the checked-in schema.graphql)
+                to validate against; skips introspection and the cache entirely.
+            schema_cache (SchemaCache, optional): Where to look for / store the introspected
+                schema. Defaults to a SchemaCache for `endpoint` under SCHEMA_CACHE_DIR.
+            execute_timeout (int): Seconds before a single request is abandoned.
+            persisted_queries (bool, optional): Send registered documents as persisted-query
+                hashes (True) or as full text (False). None detects server support.
+        """
+        transport = AIOHTTPTransport(
+            url=endpoint,
+            headers={'x-api-key': api_key},
+        )
+
+        schema = None
+        self.schema_cache = None
+        if schema_file:
+            with open(schema_file, "r") as f:
+                schema = f.read()
+        else:
+            self.schema_cache = schema_cache or SchemaCache(endpoint, api_key)
+            schema = self.schema_cache.load()
+            if schema is not None and self.schema_cache.is_stale():
+                self.schema_cache.refresh_in_background()
+
+        # Without a schema gql introspects on connect; we then cache what it fetched.
+        self.client = Client(
+            schema=schema,
+            transport=transport,
+            fetch_schema_from_transport=schema is None,
+            execute_timeout=execute_timeout,
+        )
+        self.persisted_queries = persisted_queries
+        self._session = None
+        self._connect_lock = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    async def session(self):
+        """Return the shared session, connecting on first use."""
+        if self._session is None:
+            if self._connect_lock is None:
+                self._connect_lock = asyncio.Lock()
+            async with self._connect_lock:
+                if self._session is None:
+                    self._session = await self.client.connect_async(reconnecting=False)
+                    if self.schema_cache is not None and self.schema_cache.load() is None:
+                        self.schema_cache.save(print_schema(self.client.schema))
+        return self._session
+
+    async def execute(self, document, variable_values: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Execute a document on the shared session; same call shape as gql's execute.
+        Each request is timed into graphql_request_seconds by operation name.
+        """
+        session = await self.session()
+        operation = operation_name(document)
+        started = time.perf_counter()
+        try:
+            if isinstance(document, RegisteredQuery):
+                return await self._execute_registered(document, variable_values)
+            return await session.execute(document, variable_values=variable_values)
+        except Exception:
+            metrics.increment("graphql_errors_total", operation=operation)
+            raise
+        finally:
+            metrics.observe("graphql_request_seconds", time.perf_counter() - started, operation=operation)
+
+    async def _send(self, request):
+        return await asyncio.wait_for(self.client.transport.execute(request), self.client.execute_timeout)
+
+    async def _execute_registered(self, registered: RegisteredQuery,
+                                  variable_values: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if self.client.schema is not None:
+            registered.validated_for(self.client.schema)
+
+        if self.persisted_queries is False:
+            result = await self._send(registered.request(variable_values))
+        else:
+            try:
+                result = await self._send(registered.request(variable_values, include_text=False, persisted=True))
+            except TransportServerError:
+                if self.persisted_queries is not None:
+                    raise
+                result = None  # e.g. a 400 for a body without a query: no support
+
+            if result is not None and any(error_code(error) == PERSISTED_QUERY_NOT_FOUND
+                                          for error in result.errors or []):
+                self.persisted_queries = True
+                metrics.increment("graphql_persisted_query_misses_total", operation=registered.operation_name)
+                result = await self._send(registered.request(variable_values, persisted=True))
+            elif self.persisted_queries is None:
+                self.persisted_queries = result is not None and not _not_executed(result)
+                if not self.persisted_queries:
+                    result = await self._send(registered.request(variable_values))
+
+        if result.errors:
+            raise TransportQueryError(str(result.errors[0]), errors=result.errors,
+                                      data=result.data, extensions=result.extensions)
+        return result.data
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self.client.close_async()
+            self._session = None
+
+    ############################################################################
+    ## Sync bridge
+
+    def _background_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=self._loop.run_forever, name="graphql-loop", daemon=True)
+                thread.start()
+                atexit.register(self.shutdown)
+        return self._loop
+
+    def run(self, coroutine):
+        """Run a coroutine on the background loop and block until it finishes."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._background_loop()).result()
+
+    def shutdown(self) -> None:
+        """Close the shared session and stop the background loop."""
+        if self._loop is not None and self._loop.is_running():
+            self.run(self.close())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def iterate(self, async_iterator: AsyncIterator) -> Iterator:
+        """Drive an async iterator from sync code, one item at a time."""
+        while True:
+            try:
+                yield self.run(async_iterator.__anext__())
+            except StopAsyncIteration:
+                return
+
+    def run_concurrently(self, *coroutines):
+        """
+        Run independent coroutines at the same time and return their results in order.
+
+        e.g. tasks, okrs = connection.run_concurrently(
+                 async_task.list_tasks(), async_okr.list_okrs(NullModel()))
+        """
+        async def gather():
+            return await asyncio.gather(*coroutines)
+        return self.run(gather())
@@ -0,0 +1,111 @@
+from typing import Dict, Any, Optional, Tuple
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+################################################################################
+##
+## One pooled HTTP session for the tools that call external APIs.
+##
+## Connections are kept alive and reused across tool calls; every request has a
+## connect/read timeout, and GET/HEAD requests are retried a bounded number of
+## times with backoff on connection errors and 429/5xx responses.
+##
+## get_json() can also cache a response. Within `ttl` seconds it is served from
+## memory; after that, if the server sent an ETag or Last-Modified, the request
+## is made conditional and a 304 reuses the cached body.
+
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+DEFAULT_RETRIES = 2
+POOL_SIZE = 8
+
+
+class HTTPClient:
+    def __init__(self, timeout: Tuple[float, float] = DEFAULT_TIMEOUT, retries: int = DEFAULT_RETRIES,
+                 pool_size: int = POOL_SIZE):
+        """
+        Args:
+            timeout: Default (connect, read) timeout in seconds for every request.
+            retries (int): Retries after the first attempt, for GET/HEAD only.
+            pool_size (int): Keep-alive connections kept per host; at least the
+                number of tool calls that may run at once.
+        """
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            read=0,  # A read timeout means the server is slow, not down; don't wait for it again
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._cache = {}  # (url, headers) -> {"expires_at", "etag", "last_modified", "data"}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout=None) -> requests.Response:
+        """GET on the shared session with the default timeout and retries."""
+        return self.session.get(url, headers=headers, timeout=timeout or self.timeout)
+
+    def get_json(self, url: str, headers: Optional[Dict[str, str]] = None, ttl: float = 0,
+                 timeout=None) -> Any:
+        """
+        GET `url` and return the decoded JSON body.
+
+        Args:
+            url (str): The URL to fetch.
+            headers (dict, optional): Extra request headers; part of the cache key.
+            ttl (float): Seconds a response is reused without asking the server.
+                With ttl=0 nothing is cached, e.g. for endpoints that return
+                something different on every call.
+            timeout (optional): Overrides the default (connect, read) timeout.
+        """
+        if ttl <= 0:
+            response = self.get(url, headers, timeout)
+            response.raise_for_status()
+            return response.json()
+
+        key = (url, tuple(sorted((headers or {}).items())))
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None and entry["expires_at"] > time.monotonic():
+            return entry["data"]
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry["etag"]:
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self.get(url, request_headers, timeout)
+        if response.status_code == 304 and entry is not None:
+            # Not modified: keep the body, and the validators unless new ones were sent.
+            entry = dict(entry, expires_at=time.monotonic() + ttl)
+            entry["etag"] = response.headers.get("ETag") or entry["etag"]
+            entry["last_modified"] = response.headers.get("Last-Modified") or entry["last_modified"]
+        else:
+            response.raise_for_status()
+            entry = {
+                "expires_at": time.monotonic() + ttl,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "data": response.json(),
+            }
+
+        with self._lock:
+            self._cache[key] = entry
+        return entry["data"]
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,186 @@
+from typing import Dict, List, Any, Optional, Callable, Set
+import copy
+import json
+from BlobStore import sent_documents, document_note, DOCUMENT_KEEP_TURNS, MAX_REQUEST_DOCUMENTS
+
+
+################################################################################
+##
+## Keeps the conversation history sent to Converse under a token budget.
+##
+## The history is split into turns; a turn starts at a user message that carries
+## text (tool results are also user messages, but they belong to the turn that
+## asked for them). Only whole turns are removed, oldest first, so every toolUse
+## keeps its toolResult and the history still starts with a user message.
+##
+## Removed turns are either dropped or, with a `summarize` callback, folded into
+## a rolling summary that is prepended (as a text block) to the first kept user
+## message. Once over budget, turns are removed down to TARGET_RATIO of the
+## budget, so compaction does not run again on the very next turn.
+##
+## Messages are counted as they will be sent: a document that inline_documents
+## no longer includes (BlobStore.sent_documents) counts as the note sent in its
+## place, not as its content.
+
+CHARS_PER_TOKEN = 4
+TARGET_RATIO = 0.75
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+# Documents are estimated from their stored size. Text formats cost about one
+# token per CHARS_PER_TOKEN bytes; a PDF's bytes are mostly layout, fonts and
+# images, so it is counted by page, a page being about PDF_BYTES_PER_PAGE, and
+# capped so one attachment cannot take the whole budget on an estimate alone.
+TEXT_DOCUMENT_FORMATS = ("txt", "md", "html", "csv")
+PDF_BYTES_PER_PAGE = 75_000
+TOKENS_PER_PAGE = 800
+MAX_DOCUMENT_TOKENS = 20_000
+IMAGE_TOKENS = 1_600  # Images are scaled down to about this many tokens
+
+
+def source_size(source: Dict[str, Any]) -> int:
+    """The decoded size in bytes of a document or image source."""
+    if "blobRef" in source:
+        return source.get("size", 0)  # Payload lives in the BlobStore
+    data = source.get("bytes", b"")
+    # Base64 text carries 3 bytes per 4 characters.
+    return len(data) * 3 // 4 if isinstance(data, str) else len(data)
+
+
+def estimate_document_tokens(document: Dict[str, Any]) -> int:
+    """Rough token estimate for a document block's body, by format and size."""
+    size = source_size(document.get("source", {}))
+    if document.get("format") in TEXT_DOCUMENT_FORMATS:
+        return size // CHARS_PER_TOKEN + 1
+    pages = -(-size // PDF_BYTES_PER_PAGE)
+    return min(max(pages, 1) * TOKENS_PER_PAGE, MAX_DOCUMENT_TOKENS)
+
+
+def estimate_block_tokens(block: Dict[str, Any]) -> int:
+    """Rough token estimate for one content block."""
+    if "text" in block:
+        return len(block["text"]) // CHARS_PER_TOKEN + 1
+    if "document" in block:
+        return estimate_document_tokens(block["document"])
+    if "image" in block:
+        return IMAGE_TOKENS
+    return len(json.dumps(block, default=str)) // CHARS_PER_TOKEN + 1
+
+
+def split_turns(conversation_history: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group messages into turns, each starting at a user message with text."""
+    turns = []
+    for message in conversation_history:
+        starts_turn = message["role"] == "user" and any("text" in block for block in message["content"])
+        if starts_turn or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+class HistoryManager:
+    def __init__(self, budget_tokens: int, keep_recent_turns: int = 2,
+                 summarize: Optional[Callable[[List[Dict[str, Any]]], str]] = None,
+                 document_keep_turns: int = DOCUMENT_KEEP_TURNS,
+                 max_documents: int = MAX_REQUEST_DOCUMENTS):
+        """
+        Args:
+            budget_tokens (int): Estimated tokens the history may use before compaction.
+            keep_recent_turns (int): Turns that are never removed, however large.
+            summarize (callable, optional): Given the removed messages, returns a
+                summary text. Without it, removed turns are simply dropped.
+            document_keep_turns (int): The `keep_turns` that inline_documents uses.
+            max_documents (int): The `max_documents` that inline_documents uses.
+        """
+        self.budget_tokens = budget_tokens
+        self.keep_recent_turns = keep_recent_turns
+        self.summarize = summarize
+        self.document_keep_turns = document_keep_turns
+        self.max_documents = max_documents
+        self._estimates = {}  # id(message) -> (message, tokens, {block index: tokens saved as a note})
+
+    def estimate_tokens(self, message: Dict[str, Any], sent_blocks: Optional[Set[int]] = None) -> int:
+        """
+        Estimate the tokens of one message, memoized per message object. With
+        `sent_blocks`, documents at other block positions count as their note.
+        """
+        cached = self._estimates.get(id(message))
+        if cached is None or cached[0] is not message:
+            tokens, savings = 0, {}
+            for index, block in enumerate(message["content"]):
+                block_tokens = estimate_block_tokens(block)
+                tokens += block_tokens
+                if "document" in block:
+                    savings[index] = block_tokens - estimate_block_tokens(document_note(block["document"]))
+            cached = (message, tokens, savings)
+            self._estimates[id(message)] = cached
+
+        _, tokens, savings = cached
+        if sent_blocks is not None:
+            tokens -= sum(saved for index, saved in savings.items() if index not in sent_blocks)
+        return tokens
+
+    def message_tokens(self, conversation_history: List[Dict[str, Any]]) -> List[int]:
+        """The estimated tokens of each message, as it will be sent."""
+        sent = sent_documents(conversation_history, self.document_keep_turns, self.max_documents)
+        return [
+            self.estimate_tokens(message, {index for sent_position, index in sent if sent_position == position})
+            for position, message in enumerate(conversation_history)
+        ]
+
+    def total_tokens(self, conversation_history: List[Dict[str, Any]]) -> int:
+        return sum(self.message_tokens(conversation_history))
+
+    def compact(self, conversation_history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Return the history unchanged if it fits the budget (or no turn can be
+        removed), otherwise a new list with the oldest turns summarized or dropped.
+        """
+        message_tokens = self.message_tokens(conversation_history)
+        total = sum(message_tokens)
+        if total <= self.budget_tokens:
+            return conversation_history
+
+        # Removing the oldest turns does not change which documents are sent.
+        tokens_by_message = {id(message): tokens for message, tokens in zip(conversation_history, message_tokens)}
+
+        turns = split_turns(conversation_history)
+        target = self.budget_tokens * TARGET_RATIO
+        removed = []
+        while len(turns) > self.keep_recent_turns and total > target:
+            turn = turns.pop(0)
+            removed.extend(turn)
+            total -= sum(tokens_by_message[id(message)] for message in turn)
+
+        # Forget estimates for messages that left the history.
+        kept = [message for turn in turns for message in turn]
+        kept_ids = {id(message) for message in kept}
+        self._estimates = {key: value for key, value in self._estimates.items() if key in kept_ids}
+
+        if not removed:
+            return conversation_history
+        if self.summarize is None:
+            return kept
+
+        summary = self.summarize(removed)
+        first = copy.copy(kept[0])
+        first["content"] = [{"text": SUMMARY_PREFIX + summary}] + [
+            block for block in first["content"]
+            if not ("text" in block and block["text"].startswith(SUMMARY_PREFIX))
+        ]
+        return [first] + kept[1:]
+
+
+def render_for_summary(messages: List[Dict[str, Any]]) -> str:
+    """Flatten messages into plain text for a summarization prompt."""
+    lines = []
+    for message in messages:
+        for block in message["content"]:
+            if "text" in block:
+                lines.append(f"{message['role']}: {block['text']}")
+            elif "toolUse" in block:
+                lines.append(f"{message['role']} called {block['toolUse']['name']}({json.dumps(block['toolUse']['input'])})")
+            elif "toolResult" in block:
+                lines.append(f"tool result: {json.dumps(block['toolResult']['content'], default=str)[:2000]}")
+            elif "document" in block:
+                lines.append(f"{message['role']} attached document {block['document'].get('name', '')}")
+    return "\n".join(lines)
@@ -0,0 +1,151 @@
+from typing import Dict, List, Any, Optional, Tuple, AsyncIterator
+from functools import lru_cache
+from LocalReplica import Replica
+from ResponseDecoders import decoder_for
+from QueryRegistry import RegisteredQuery, query
+import time
+
+
+################################################################################
+##
+## Reading an Amplify model through its list query.
+##
+## A ListQuery describes one list field (listTasks, listOKRS): its full
+## document, the output model, and documents selecting only the fields of a
+## projection, generated once per field set. AsyncListAccess is the base of
+## the access classes (AsyncTask, AsyncOKR): it walks the pages with
+## nextToken and keeps an optional Replica in sync.
+
+# Seconds between full syncs of a replica, which pick up deletions by other clients.
+FULL_SYNC_INTERVAL = 600.0
+
+# Page size used when walking a list query with nextToken.
+DEFAULT_PAGE_SIZE = 100
+
+
+@lru_cache(maxsize=None)
+def _projected_list_document(list_field: str, operation_name: str, filter_type: str,
+                             fields: Tuple[str, ...]) -> RegisteredQuery:
+    selection = "".join(f"      {field}\n" for field in fields)
+    return query(
+        f"query {operation_name}($filter: {filter_type}, $limit: Int, $nextToken: String) {{\n"
+        f"  {list_field}(filter: $filter, limit: $limit, nextToken: $nextToken) {{\n"
+        f"    nextToken\n    items {{\n{selection}    }}\n  }}\n}}"
+    )
+
+
+class ListQuery:
+    def __init__(self, list_field: str, filter_type: str, document: RegisteredQuery, model):
+        """
+        Args:
+            list_field (str): The query field, e.g. "listTasks".
+            filter_type (str): The type of its `filter` argument, e.g. "ModelTaskFilterInput".
+            document (RegisteredQuery): The document selecting every field of `model`.
+            model: The output model of a full record, e.g. TaskOut.
+        """
+        self.list_field = list_field
+        self.filter_type = filter_type
+        self.full_document = document
+        self.model = model
+
+    def document(self, projection=None) -> RegisteredQuery:
+        """
+        The list document selecting the fields of `projection` (the full model by
+        default, or a model with a subset of its fields such as TaskName).
+
+        Raises:
+            ValueError: If the projection has fields that the model does not.
+        """
+        if projection is None or projection is self.model:
+            return self.full_document
+        fields = decoder_for(projection).fields
+        unknown = set(fields) - set(decoder_for(self.model).fields)
+        if unknown:
+            raise ValueError(f"{projection.__name__} is not a projection of {self.model.__name__}: "
+                             f"{', '.join(sorted(unknown))}")
+        return _projected_list_document(self.list_field, self.full_document.operation_name,
+                                        self.filter_type, fields)
+
+
+class AsyncListAccess:
+    list_query: ListQuery = None  # Set by each subclass
+
+    def __init__(self, client, replica: Optional[Replica] = None, sync_interval: float = 60.0,
+                 full_sync_interval: float = FULL_SYNC_INTERVAL):
+        """
+        Args:
+            client: An async gql session, or a GraphQLConnection shared with other access classes.
+            replica (Replica, optional): A local copy of the table. When set, listing
+                is served from the replica and writes go through to it.
+            sync_interval (float): Seconds a replica is considered fresh before
+                the next list runs another incremental sync.
+            full_sync_interval (float): Seconds after which a sync downloads every
+                record again instead of only changed ones, to drop records deleted
+                by other clients. Checked on the first list in each process.
+        """
+        self.client = client
+        self.replica = replica
+        self.sync_interval = sync_interval
+        self.full_sync_interval = full_sync_interval
+        self._synced = False  # No sync has run in this process yet
+
+    async def _iter_records(self, page_size: int = DEFAULT_PAGE_SIZE,
+                            filter: Optional[Dict[str, Any]] = None,
+                            projection=None) -> AsyncIterator[Dict[str, Any]]:
+        document = self.list_query.document(projection)
+        next_token = None
+        while True:
+            variables = {"limit": page_size, "nextToken": next_token}
+            if filter:
+                variables["filter"] = filter
+            result = await self.client.execute(document, variable_values=variables)
+
+            page = result[self.list_query.list_field]
+            for item in page['items']:
+                yield item
+
+            next_token = page.get('nextToken')
+            if not next_token:
+                break
+
+    async def sync(self, full: bool = False) -> None:
+        """
+        Bring the local replica up to date with the GraphQL API.
+
+        The first sync (or `full=True`, or once the last full sync is
+        `full_sync_interval` old) downloads every record and replaces the
+        replica. Other syncs only request records whose `updatedAt` is at or
+        after the stored high-water mark. Deletions made by other clients are
+        only picked up by a full sync. Local writes made while pages were being
+        fetched are kept (see Replica.write_position).
+        """
+        if self.replica is None:
+            raise ValueError(f"{type(self).__name__}.sync() needs a replica")
+
+        since = self.replica.write_position()
+        if full or self._full_sync_due():
+            self.replica.replace_all([record async for record in self._iter_records()], since=since)
+        else:
+            changed = self._iter_records(filter={"updatedAt": {"ge": self.replica.high_water_mark()}})
+            self.replica.merge([record async for record in changed], since=since)
+        self._synced = True
+
+    def _full_sync_due(self) -> bool:
+        return (not self.replica.high_water_mark()
+                or time.time() - self.replica.last_full_sync() >= self.full_sync_interval)
+
+    def _needs_sync(self) -> bool:
+        return not self._synced or time.time() - self.replica.last_sync() >= self.sync_interval
+
+    def _replica_is_cold(self) -> bool:
+        """
+        True without a replica, or if reading it would first download every
+        record. A projection is then cheaper to fetch with its own document.
+        """
+        return self.replica is None or (self._needs_sync() and self._full_sync_due())
+
+    async def _replica_records(self) -> List[Dict[str, Any]]:
+        """The replica's records, after an incremental sync once it is `sync_interval` old."""
+        if self._needs_sync():
+            await self.sync()
+        return self.replica.records()
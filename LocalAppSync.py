@@ -0,0 +1,265 @@
+from typing import Dict, List, Any, Optional
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from itertools import islice
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from graphql import build_schema, graphql_sync
+from ModelFilters import matches_filter
+
+
+################################################################################
+##
+## An in-process stand-in for the AppSync API, for benchmarks and local runs.
+##
+## It serves schema.graphql over HTTP on 127.0.0.1 with in-memory Task, OKR
+## and Todo tables, so GraphQLConnection and the access classes run unchanged
+## against `server.endpoint`. Behaviour follows the Amplify/DynamoDB resolvers
+## where the client can notice it:
+##
+##   - list queries read `limit` records (default 100) and then apply the
+##     filter, so a page may come back short or empty with a nextToken;
+##   - update and delete of a missing id fail like a conditional check;
+##   - createdAt/updatedAt are set by the server as AWSDateTime strings.
+##
+## With persisted_queries=True it also speaks the Automatic Persisted Queries
+## protocol: a request may carry only extensions.persistedQuery.sha256Hash, and
+## an unknown hash is answered with PersistedQueryNotFound until the client
+## sends the text along with it. Otherwise a hash-only request fails like a
+## request without a query.
+##
+## `latency` (seconds, plus up to `jitter`) is added to every request, to model
+## the network round-trip to the real endpoint.
+##
+##     with LocalAppSync(latency=0.02).seed(tasks=1000) as server:
+##         connection = GraphQLConnection(server.endpoint, "local", schema_file=SCHEMA_FILE)
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.graphql")
+DEFAULT_LIST_LIMIT = 100
+
+
+def aws_datetime(moment: Optional[datetime] = None) -> str:
+    moment = moment or datetime.now(timezone.utc)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.') + f"{moment.microsecond // 1000:03d}Z"
+
+
+class LocalAppSync:
+    def __init__(self, schema_file: str = SCHEMA_FILE, latency: float = 0.0, jitter: float = 0.0,
+                 api_key: Optional[str] = None, port: int = 0, persisted_queries: bool = True):
+        """
+        Args:
+            schema_file (str): The SDL to serve.
+            latency (float): Seconds added to every request.
+            jitter (float): Up to this many further seconds, chosen at random per request.
+            api_key (str, optional): If set, requests must carry it as `x-api-key`.
+            port (int): Port to listen on; 0 picks a free one.
+            persisted_queries (bool): Accept persisted-query hashes in place of the query text.
+        """
+        with open(schema_file, "r") as f:
+            self.schema = build_schema(f.read())
+        self.latency = latency
+        self.jitter = jitter
+        self.api_key = api_key
+        self.port = port
+        self.persisted_queries = persisted_queries
+        self.persisted = {}  # sha256 -> query text
+        self.query_bytes = 0  # Query text received, to compare hash-only and full-text clients
+        self.tables = {"tasks": {}, "okrs": {}, "todos": {}}
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._root = {
+            "getTask": lambda info, id: self.tables["tasks"].get(id),
+            "listTasks": self._list("tasks"),
+            "listOKRS": self._list("okrs"),
+            "createTask": self._create("tasks"),
+            "updateTask": self._update("tasks"),
+            "deleteTask": self._delete("tasks"),
+            "createOKR": self._create("okrs"),
+            "createTodo": self._create("todos"),
+        }
+
+    ############################################################################
+    ## Data
+
+    def seed(self, tasks: int = 0, okrs: int = 0, seed: int = 0) -> "LocalAppSync":
+        """Add `tasks` Tasks and `okrs` OKRs with deterministic contents; returns self."""
+        rng = random.Random(seed)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        with self._lock:
+            for i in range(tasks):
+                stamp = aws_datetime(start + timedelta(minutes=i))
+                task_id = f"task-{len(self.tables['tasks']):07d}"
+                self.tables["tasks"][task_id] = {
+                    "id": task_id,
+                    "name": f"Seeded task {i}",
+                    "description": f"Seeded task {i} for local benchmarks",
+                    "estimated_time_mins": rng.choice([15, 30, 60, 120]),
+                    "priority": rng.randint(1, 5),
+                    "tags": rng.sample(["work", "home", "health", "admin", "errand", "deep"], 2),
+                    "scheduled_date_utc": int(start.timestamp()) + rng.randint(0, 90) * 86400,
+                    "createdAt": stamp,
+                    "updatedAt": stamp,
+                }
+            for i in range(okrs):
+                stamp = aws_datetime(start + timedelta(minutes=i))
+                okr_id = f"okr-{len(self.tables['okrs']):07d}"
+                self.tables["okrs"][okr_id] = {
+                    "id": okr_id,
+                    "title": f"Seeded OKR {i}",
+                    "description": f"Seeded OKR {i} for local benchmarks",
+                    "createdAt": stamp,
+                    "updatedAt": stamp,
+                }
+        return self
+
+    def _list(self, table):
+        def resolve(info, filter=None, limit=None, nextToken=None):
+            start = int(nextToken or 0)
+            end = start + (limit or DEFAULT_LIST_LIMIT)
+            with self._lock:
+                page = list(islice(self.tables[table].values(), start, end))
+                total = len(self.tables[table])
+            return {
+                "items": [record for record in page if matches_filter(record, filter)],
+                "nextToken": str(end) if end < total else None,
+            }
+        return resolve
+
+    def _create(self, table):
+        def resolve(info, input):
+            record = dict(input)
+            record.setdefault("id", str(uuid.uuid4()))
+            record["createdAt"] = record["updatedAt"] = aws_datetime()
+            with self._lock:
+                if record["id"] in self.tables[table]:
+                    raise Exception("The conditional request failed (Service: DynamoDb)")
+                self.tables[table][record["id"]] = record
+            return record
+        return resolve
+
+    def _update(self, table):
+        def resolve(info, input):
+            with self._lock:
+                record = self.tables[table].get(input["id"])
+                if record is None:
+                    raise Exception("The conditional request failed (Service: DynamoDb)")
+                record.update(input)
+                record["updatedAt"] = aws_datetime()
+                return dict(record)
+        return resolve
+
+    def _delete(self, table):
+        def resolve(info, input):
+            with self._lock:
+                record = self.tables[table].pop(input["id"], None)
+            if record is None:
+                raise Exception("The conditional request failed (Service: DynamoDb)")
+            return record
+        return resolve
+
+    ############################################################################
+    ## Serving
+
+    def _resolve_query(self, body: Dict[str, Any]):
+        """Return (query text, None), or (None, error response) for the persisted-query protocol."""
+        text = body.get("query")
+        persisted = (body.get("extensions") or {}).get("persistedQuery")
+        if not persisted or not self.persisted_queries:
+            return text or "", None
+
+        digest = persisted.get("sha256Hash", "")
+        if text is None:
+            with self._lock:
+                text = self.persisted.get(digest)
+            if text is None:
+                return None, {"errors": [{"message": "PersistedQueryNotFound",
+                                          "extensions": {"code": "PERSISTED_QUERY_NOT_FOUND"}}]}
+            return text, None
+
+        if hashlib.sha256(text.encode("utf-8")).hexdigest() != digest:
+            return None, {"errors": [{"message": "provided sha does not match query",
+                                      "extensions": {"code": "BAD_USER_INPUT"}}]}
+        with self._lock:
+            self.persisted[digest] = text
+        return text, None
+
+    def execute(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run one GraphQL request body ({"query", "variables", "operationName"}, and
+        optionally "extensions": {"persistedQuery": {"version": 1, "sha256Hash": ...}}).
+        """
+        with self._lock:
+            self.request_count += 1
+            self.query_bytes += len(body.get("query") or "")
+        text, error_response = self._resolve_query(body)
+        if error_response is not None:
+            return error_response
+        result = graphql_sync(
+            self.schema, text, root_value=self._root,
+            variable_values=body.get("variables"), operation_name=body.get("operationName"),
+        )
+        response = {"data": result.data}
+        if result.errors:
+            response["errors"] = [error.formatted for error in result.errors]
+        return response
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real endpoint
+            disable_nagle_algorithm = True  # Headers and body are separate writes; don't stall on delayed ACKs
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if server.latency or server.jitter:
+                    time.sleep(server.latency + random.random() * server.jitter)
+                if server.api_key is not None and self.headers.get("x-api-key") != server.api_key:
+                    return self._send(401, {"errors": [{"errorType": "UnauthorizedException",
+                                                        "message": "You are not authorized to make this call."}]})
+                try:
+                    request = json.loads(body)
+                except ValueError:
+                    return self._send(400, {"errors": [{"message": "Invalid JSON body"}]})
+                self._send(200, server.execute(request))
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/graphql"
+
+    def start(self) -> "LocalAppSync":
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="local-appsync", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
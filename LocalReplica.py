@@ -0,0 +1,173 @@
+from typing import Dict, List, Any, Optional, Iterable
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+################################################################################
+##
+## A local, on-disk copy of one GraphQL model table (Tasks, OKRs, ...).
+##
+## Records are stored exactly as the API returns them, keyed on `id`, next to
+## a high-water mark: the largest `updatedAt` seen so far. An incremental sync
+## then only needs to ask the API for records updated at or after that mark.
+## Incremental syncs never see deletions by other clients, so callers also run
+## a full sync (replace_all) every so often; last_full_sync() says when.
+##
+## Local writes (upsert/delete after a mutation) are journaled with a position.
+## A sync takes write_position() before it starts fetching and passes it to
+## replace_all/merge, which re-apply the writes made meanwhile, so a page fetched
+## before a delete cannot bring the deleted record back.
+
+# Journal entries older than this are dropped; no sync takes that long.
+WRITE_JOURNAL_SECS = 600
+
+class Replica:
+    def __init__(self, path: str, table: str):
+        """
+        Open (or create) the replica for `table` in the SQLite file at `path`.
+
+        Args:
+            path (str): The SQLite database file. Several tables may share one file.
+            table (str): The table name, e.g. "tasks" or "okrs".
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._writes = []  # (position, time.time(), id, record or None for a delete)
+        self._write_position = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(id TEXT PRIMARY KEY, updatedAt TEXT, record TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS replica_meta "
+                "(tbl TEXT PRIMARY KEY, high_water TEXT, last_sync REAL, last_full_sync REAL)"
+            )
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(replica_meta)")]
+            if "last_full_sync" not in columns:  # Files written before full resyncs existed
+                self._conn.execute("ALTER TABLE replica_meta ADD COLUMN last_full_sync REAL")
+
+    def high_water_mark(self) -> Optional[str]:
+        """Return the largest `updatedAt` synced so far, or None before the first sync."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT high_water FROM replica_meta WHERE tbl = ?", (self.table,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def last_sync(self) -> float:
+        """Return the time.time() of the last completed sync, or 0.0 if never synced."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_sync FROM replica_meta WHERE tbl = ?", (self.table,)
+            ).fetchone()
+        return row[0] if row and row[0] else 0.0
+
+    def last_full_sync(self) -> float:
+        """Return the time.time() of the last replace_all, or 0.0 if there was none."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_full_sync FROM replica_meta WHERE tbl = ?", (self.table,)
+            ).fetchone()
+        return row[0] if row and row[0] else 0.0
+
+    def write_position(self) -> int:
+        """The position of the latest local write; take it before a sync starts fetching."""
+        with self._lock:
+            return self._write_position
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Return every stored record, in insertion order."""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT record FROM {self.table} ORDER BY rowid").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def upsert(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Insert or replace records, e.g. the result of a create or update mutation."""
+        with self._lock, self._conn:
+            records = list(records)
+            self._upsert(records)
+            for record in records:
+                self._journal(record['id'], record)
+
+    def delete(self, record_id: str) -> None:
+        """Remove a record, e.g. after a delete mutation."""
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (record_id,))
+            self._journal(record_id, None)
+
+    def _journal(self, record_id, record):
+        now = time.time()
+        self._write_position += 1
+        self._writes.append((self._write_position, now, record_id, record))
+        while self._writes and self._writes[0][1] < now - WRITE_JOURNAL_SECS:
+            self._writes.pop(0)
+
+    def _reapply_writes(self, since):
+        # Local writes made while the sync was fetching win over what it fetched.
+        for position, _, record_id, record in self._writes:
+            if position <= since:
+                continue
+            if record is None:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (record_id,))
+            else:
+                self._upsert([record])
+
+    def replace_all(self, records: Iterable[Dict[str, Any]], since: Optional[int] = None) -> None:
+        """
+        Replace the whole table with `records` (a full sync) and mark it synced.
+
+        Args:
+            records: Every record, as fetched from the API.
+            since (int, optional): write_position() from before the fetch; local
+                writes made after it are applied on top of `records`.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.execute("DELETE FROM replica_meta WHERE tbl = ?", (self.table,))
+            high_water = self._upsert(records)
+            if since is not None:
+                self._reapply_writes(since)
+            self._mark_synced(high_water, full=True)
+
+    def merge(self, records: Iterable[Dict[str, Any]], since: Optional[int] = None) -> None:
+        """Upsert the records from an incremental sync and mark the table synced (see replace_all)."""
+        with self._lock, self._conn:
+            high_water = self._upsert(records)
+            if since is not None:
+                self._reapply_writes(since)
+            self._mark_synced(high_water)
+
+    def _upsert(self, records):
+        high_water = None
+        for record in records:
+            updated_at = record.get('updatedAt')
+            self._conn.execute(
+                f"INSERT INTO {self.table} (id, updatedAt, record) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET updatedAt = excluded.updatedAt, record = excluded.record",
+                (record['id'], updated_at, json.dumps(record)),
+            )
+            if updated_at and (high_water is None or updated_at > high_water):
+                high_water = updated_at
+        return high_water
+
+    def _mark_synced(self, high_water, full=False):
+        # Never move the mark backwards: an empty incremental page keeps the old one.
+        now = time.time()
+        self._conn.execute(
+            "INSERT INTO replica_meta (tbl, high_water, last_sync, last_full_sync) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(tbl) DO UPDATE SET "
+            "high_water = MAX(COALESCE(replica_meta.high_water, ''), COALESCE(excluded.high_water, '')), "
+            "last_sync = excluded.last_sync, "
+            "last_full_sync = COALESCE(excluded.last_full_sync, replica_meta.last_full_sync)",
+            (self.table, high_water, now, now if full else None),
+        )
@@ -0,0 +1,184 @@
+from typing import Dict, List, Any, Optional, Tuple
+from contextlib import contextmanager
+from collections import deque
+import json
+import math
+import threading
+import time
+
+
+################################################################################
+##
+## In-process metrics: where a slow turn spends its time.
+##
+## Histograms and counters are keyed by metric name plus labels, e.g.
+##
+##     metrics.observe("tool_call_seconds", 0.42, tool="list_tasks")
+##     metrics.increment("converse_tokens_total", 812, type="input")
+##     with metrics.timer("graphql_request_seconds", operation="ListTasks"):
+##         ...
+##
+## Histograms keep Prometheus-style cumulative buckets plus the most recent
+## RECENT_SAMPLES observations, from which p50/p90/p99 are computed. A snapshot
+## is available as a dict (snapshot(), JSON-ready) or in the Prometheus text
+## exposition format (to_prometheus()).
+##
+## `metrics` below is the process-wide registry the CLI and access layer record to.
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (1, 2, 3, 4, 5, 8, 13, 21)
+RECENT_SAMPLES = 1024
+
+HELP = {
+    "tool_call_seconds": "Time spent running a tool function.",
+    "tool_calls_total": "Tool calls by outcome (ok, error, timeout).",
+    "tool_cache_hits_total": "Tool calls answered from the tool result cache.",
+    "graphql_request_seconds": "Time per GraphQL request, by operation name.",
+    "graphql_errors_total": "GraphQL requests that failed, by operation name.",
+    "graphql_persisted_query_misses_total": "Persisted-query hashes the server did not know yet.",
+    "converse_seconds": "Time per Converse or ConverseStream call.",
+    "converse_first_token_seconds": "Time until the first streamed text or tool block.",
+    "converse_round_trips": "Converse calls needed to answer one user turn.",
+    "converse_tokens_total": "Tokens reported in Converse usage, by type (input, output, cache_read, cache_write).",
+}
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = SECONDS_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def summary(self) -> Dict[str, Any]:
+        recent = sorted(self.recent)
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            running += count
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": _percentile(recent, 0.50),
+            "p90": _percentile(recent, 0.90),
+            "p99": _percentile(recent, 0.99),
+            "max": recent[-1] if recent else None,
+            "buckets": cumulative,
+        }
+
+
+def _label_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _prometheus_labels(label_key, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(label_key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (
+        key + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self._histograms = {}  # (name, label key) -> Histogram
+        self._counters = {}    # (name, label key) -> float
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = SECONDS_BUCKETS, **labels) -> None:
+        """Record one observation (seconds, unless `buckets` says otherwise)."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1, **labels) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the wall time of the `with` block, also when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns:
+            {"histograms": {name: [{"labels": {...}, "count": ..., "p50": ..., ...}]},
+             "counters": {name: [{"labels": {...}, "value": ...}]}}
+        """
+        with self._lock:
+            histograms = [(name, labels, histogram.summary()) for (name, labels), histogram in self._histograms.items()]
+            counters = list(self._counters.items())
+        snapshot = {"histograms": {}, "counters": {}}
+        for name, labels, summary in sorted(histograms, key=lambda item: item[:2]):
+            snapshot["histograms"].setdefault(name, []).append(dict(labels=dict(labels), **summary))
+        for (name, labels), value in sorted(counters):
+            snapshot["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        return snapshot
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_prometheus(self) -> str:
+        """The current values in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = sorted(((name, labels, histogram.summary())
+                                 for (name, labels), histogram in self._histograms.items()), key=lambda item: item[:2])
+            counters = sorted(self._counters.items())
+
+        lines = []
+        described = set()
+        for name, labels, summary in histograms:
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            for bound, count in summary["buckets"].items():
+                lines.append(f"{name}_bucket{_prometheus_labels(labels, ('le', bound))} {count}")
+            lines.append(f"{name}_sum{_prometheus_labels(labels)} {summary['sum']}")
+            lines.append(f"{name}_count{_prometheus_labels(labels)} {summary['count']}")
+        for (name, labels), value in counters:
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_prometheus_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
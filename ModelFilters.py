@@ -0,0 +1,65 @@
+from typing import Dict, Any, Optional
+
+
+################################################################################
+##
+## Client-side evaluation of Amplify Model*FilterInput objects.
+##
+## The same filter dict that is sent as the `filter` argument of a list query
+## can be applied to records held locally (a Replica, or LocalAppSync's tables),
+## so both paths return the same rows:
+##
+##     {"priority": {"le": 2}, "and": [{"tags": {"contains": "blog"}}]}
+##
+## `contains` tests substrings of strings and membership of lists, like the
+## DynamoDB condition it maps to. Range operators never match a missing value.
+
+
+def _matches_condition(value, condition: Dict[str, Any]) -> bool:
+    for op, operand in condition.items():
+        if operand is None:
+            continue
+        if op == "eq" and value != operand:
+            return False
+        if op == "ne" and value == operand:
+            return False
+        if op in ("ge", "gt", "le", "lt", "between") and value is None:
+            return False
+        if op == "ge" and not value >= operand:
+            return False
+        if op == "gt" and not value > operand:
+            return False
+        if op == "le" and not value <= operand:
+            return False
+        if op == "lt" and not value < operand:
+            return False
+        if op == "between" and not operand[0] <= value <= operand[1]:
+            return False
+        if op == "contains" and not (value is not None and operand in value):
+            return False
+        if op == "notContains" and value is not None and operand in value:
+            return False
+        if op == "beginsWith" and not (isinstance(value, str) and value.startswith(operand)):
+            return False
+    return True
+
+
+def matches_filter(record: Dict[str, Any], model_filter: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Model*FilterInput (with and/or/not) against one record."""
+    if not model_filter:
+        return True
+    for key, condition in model_filter.items():
+        if condition is None:
+            continue
+        if key == "and":
+            if not all(matches_filter(record, sub) for sub in condition):
+                return False
+        elif key == "or":
+            if not any(matches_filter(record, sub) for sub in condition):
+                return False
+        elif key == "not":
+            if matches_filter(record, condition):
+                return False
+        elif not _matches_condition(record.get(key), condition):
+            return False
+    return True
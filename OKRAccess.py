@@ -1,4 +1,4 @@
-from typing import Dict, List, Any, Optional, Union, Tuple
+from typing import Dict, List, Any, Optional, Union, Tuple, Iterator, AsyncIterator
 from typing_extensions import Annotated
 from pydantic import BaseModel, Field
 from datetime import datetime, timedelta
@@ -7,6 +7,10 @@ import json
 from gql import gql, Client
 from gql.transport.requests import RequestsHTTPTransport
 from PydanticTaskModels import *
+from LocalReplica import Replica
+from ListAccess import ListQuery, AsyncListAccess, FULL_SYNC_INTERVAL, DEFAULT_PAGE_SIZE
+from ResponseDecoders import decode_okr, decoder_for
+from QueryRegistry import query
 
 
 
@@ -23,7 +27,7 @@ from PydanticTaskModels import *
 
 
 # Updated GraphQL mutations and queries
-CREATE_OKR = gql("""
+CREATE_OKR = query("""
 mutation CreateOKR($input: CreateOKRInput!) {
     createOKR(input: $input) {
         id
@@ -35,9 +39,10 @@ mutation CreateOKR($input: CreateOKRInput!) {
 }
 """)
 
-LIST_OKRS = gql("""
-query ListOKRs {
-    listOKRS {
+LIST_OKRS = query("""
+query ListOKRs($filter: ModelOKRFilterInput, $limit: Int, $nextToken: String) {
+    listOKRS(filter: $filter, limit: $limit, nextToken: $nextToken) {
+        nextToken
         items {
             id
             title
@@ -49,14 +54,32 @@ query ListOKRs {
 }
 """)
 
+
+OKR_LIST = ListQuery("listOKRS", "ModelOKRFilterInput", LIST_OKRS, OKROut)
+
+
+def list_okrs_document(projection=OKROut):
+    """
+    The listOKRS document selecting the fields of `projection` (OKROut, or a
+    model with a subset of its fields such as OKRTitle).
+
+    Raises:
+        ValueError: If the projection has fields that an OKR does not.
+    """
+    return OKR_LIST.document(projection)
+
+
 from typing import List
 from datetime import datetime
 
-class OKR:
-    def __init__(self, client):
-        self.client = client
+class AsyncOKR(AsyncListAccess):
+    """
+    OKRs on the GraphQL API. With a replica (see AsyncListAccess), list_okrs
+    is served from the local copy and create_okr writes through to it.
+    """
+    list_query = OKR_LIST
 
-    def create_okr(self, okr_input: OKRCreate) -> OKROut:
+    async def create_okr(self, okr_input: OKRCreate) -> OKROut:
         """
         Create a new OKR and send it to the GraphQL API.
         
@@ -73,33 +96,93 @@ class OKR:
             }
         }
         
-        result = self.client.execute(CREATE_OKR, variable_values=variables)
+        result = await self.client.execute(CREATE_OKR, variable_values=variables)
         
         created_okr = result['createOKR']
+        if self.replica is not None:
+            self.replica.upsert([created_okr])
         
-        return OKROut(
-            id=created_okr['id'],
-            title=created_okr['title'],
-            description=created_okr['description'],
-            createdAt=datetime.fromisoformat(created_okr['createdAt'].replace('Z', '+00:00')),
-            updatedAt=datetime.fromisoformat(created_okr['updatedAt'].replace('Z', '+00:00'))
-        )
+        return decode_okr(created_okr)
 
-    def list_okrs(self, nm: NullModel) -> OKROutList:
+    async def iter_okrs(self, page_size: int = DEFAULT_PAGE_SIZE, projection=OKROut) -> AsyncIterator[OKROut]:
+        """
+        Iterate over all OKRs from the GraphQL API, one page at a time.
+
+        Args:
+            page_size (int): The number of OKRs requested per page.
+            projection: The model to yield, e.g. OKRTitle; only its fields are requested.
+
+        Yields:
+            OKROut: Each OKR (as `projection`), in the order returned by the API.
+        """
+        decode = decoder_for(projection)
+        async for okr in self._iter_records(page_size, projection=projection):
+            yield decode(okr)
+
+    async def project_okrs(self, projection=OKROut) -> List[Any]:
+        """
+        List all OKRs from the GraphQL API as `projection`, from the replica when
+        one is configured (after an incremental sync once it is `sync_interval` old).
+        A projection skips a cold replica, one that would need a full sync, and
+        requests only its own fields from the API.
+        """
+        if self.replica is None or (projection is not OKROut and self._replica_is_cold()):
+            return [okr async for okr in self.iter_okrs(projection=projection)]
+        return decoder_for(projection).many(await self._replica_records())
+
+    async def list_okrs(self, nm: NullModel) -> OKROutList:
         """
         List all OKRs from the GraphQL API.    
         Returns:
             OKROutList: A Pydantic model containing a list of all OKRs.
         """
-        result = self.client.execute(LIST_OKRS)    
-        okrs = result['listOKRS']['items']
-        okr_list = [
-            OKROut(
-                id=okr['id'],
-                title=okr['title'],
-                description=okr['description'],
-                createdAt=datetime.fromisoformat(okr['createdAt'].replace('Z', '+00:00')),
-                updatedAt=datetime.fromisoformat(okr['updatedAt'].replace('Z', '+00:00'))
-            ) for okr in okrs
-        ]
-        return OKROutList(okrs=okr_list)
+        return OKROutList(okrs=await self.project_okrs(OKROut))
+
+    async def list_okr_titles(self, nm: NullModel) -> OKRTitleList:
+        """
+        List only the ID and title of every OKR.
+
+        Returns:
+            OKRTitleList: All OKRs as OKRTitle objects.
+        """
+        return OKRTitleList(okrs=await self.project_okrs(OKRTitle))
+
+
+class OKR:
+    """
+    Blocking wrapper around AsyncOKR, for callers without an event loop.
+    """
+    def __init__(self, connection, replica: Optional[Replica] = None, sync_interval: float = 60.0,
+                 full_sync_interval: float = FULL_SYNC_INTERVAL):
+        """
+        Args:
+            connection (GraphQLConnection): The shared connection to run requests on.
+            replica (Replica, optional): See AsyncOKR.
+            sync_interval (float): See AsyncOKR.
+            full_sync_interval (float): See AsyncOKR.
+        """
+        self.connection = connection
+        self.async_okr = AsyncOKR(connection, replica=replica, sync_interval=sync_interval,
+                                   full_sync_interval=full_sync_interval)
+
+    @property
+    def replica(self) -> Optional[Replica]:
+        return self.async_okr.replica
+
+    def create_okr(self, okr_input: OKRCreate) -> OKROut:
+        return self.connection.run(self.async_okr.create_okr(okr_input))
+
+    def iter_okrs(self, page_size: int = DEFAULT_PAGE_SIZE, projection=OKROut) -> Iterator[OKROut]:
+        return self.connection.iterate(self.async_okr.iter_okrs(page_size, projection))
+
+    def sync(self, full: bool = False) -> None:
+        return self.connection.run(self.async_okr.sync(full))
+
+    def project_okrs(self, projection=OKROut) -> List[Any]:
+        return self.connection.run(self.async_okr.project_okrs(projection))
+
+    def list_okrs(self, nm: NullModel) -> OKROutList:
+        return self.connection.run(self.async_okr.list_okrs(nm))
+
+    def list_okr_titles(self, nm: NullModel) -> OKRTitleList:
+        return self.connection.run(self.async_okr.list_okr_titles(nm))
@@ -0,0 +1,85 @@
+from typing import Dict, List, Any
+
+
+################################################################################
+##
+## Bedrock prompt caching for Converse requests.
+##
+## A cachePoint block marks the end of a prefix the service may cache; a later
+## request starting with the same prefix reads it back instead of processing
+## it again. A request may carry at most MAX_CACHE_POINTS of them. We place:
+##
+##   - one after the tool specs, which are identical on every call;
+##   - one at the end of the newest message, written for the next call;
+##   - one at the end of messages[-3]. Messages alternate user/assistant and
+##     every request ends with a user message, so that is where the previous
+##     request ended: its cached prefix is read back even when the tool results
+##     added since then are long.
+##
+## The points are added to the request only; the history itself (and what is
+## saved in sessions) never contains them. A prefix shorter than the model's
+## minimum cacheable length is simply not cached.
+##
+## Only models in CACHING_MODELS accept cache points; any other model rejects
+## the whole request, so caching is off for them by default.
+
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+MAX_CACHE_POINTS = 4
+HISTORY_CACHE_OFFSETS = (1, 3)  # Counted from the end of the message list
+
+# Bedrock model IDs that support cache points in the tool config and messages.
+CACHING_MODELS = frozenset([
+    "anthropic.claude-3-5-haiku-20241022-v1:0",
+    "anthropic.claude-3-7-sonnet-20250219-v1:0",
+    "anthropic.claude-sonnet-4-20250514-v1:0",
+    "anthropic.claude-opus-4-20250514-v1:0",
+    "anthropic.claude-opus-4-1-20250805-v1:0",
+    "anthropic.claude-sonnet-4-5-20250929-v1:0",
+    "anthropic.claude-haiku-4-5-20251001-v1:0",
+])
+# Cross-region inference profiles prefix the model ID, e.g. "us.anthropic...".
+INFERENCE_PROFILE_PREFIXES = ("us.", "eu.", "apac.", "global.")
+
+
+def supports_caching(model_id: str) -> bool:
+    """True if `model_id` (or the model of an inference profile) is in CACHING_MODELS."""
+    for prefix in INFERENCE_PROFILE_PREFIXES:
+        if model_id.startswith(prefix):
+            model_id = model_id[len(prefix):]
+            break
+    return model_id in CACHING_MODELS
+
+
+def with_cache_point(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The tool list followed by a cache point."""
+    return list(tools) + [CACHE_POINT]
+
+
+def add_history_cache_points(messages: List[Dict[str, Any]],
+                             offsets=HISTORY_CACHE_OFFSETS) -> List[Dict[str, Any]]:
+    """
+    Return a copy of `messages` with a cache point appended to the content of
+    messages[-offset] for each offset. The input messages are not modified.
+    """
+    marked = list(messages)
+    for offset in offsets:
+        if offset <= len(marked):
+            message = marked[-offset]
+            marked[-offset] = dict(message, content=list(message.get("content", [])) + [CACHE_POINT])
+    return marked
+
+
+def caching_unsupported(error: Exception) -> bool:
+    """
+    True if a Converse error says the model does not accept cache points, e.g.
+    for a model missing from CACHING_MODELS that caching was forced on for.
+    """
+    details = getattr(error, "response", None) or {}
+    details = details.get("Error", {})
+    return details.get("Code") == "ValidationException" and "cach" in details.get("Message", "").lower()
+
+
+def cache_hit_ratio(input_tokens: float, cache_read_tokens: float, cache_write_tokens: float):
+    """The share of all prompt tokens that was read from the cache, or None without any."""
+    total = input_tokens + cache_read_tokens + cache_write_tokens
+    return cache_read_tokens / total if total else None
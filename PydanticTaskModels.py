@@ -6,6 +6,12 @@ from enum import Enum
 import json
 
 
+try:
+    import orjson  # Optional: a faster backend for BaseModelWithCustomJSON.json()
+except ImportError:
+    orjson = None
+
+
 def custom_json_serializer(obj):
     if isinstance(obj, datetime):
         return obj.isoformat()
@@ -24,6 +30,50 @@ class CustomJSONEncoder(json.JSONEncoder):
         except TypeError:
             return super().default(obj)
 
+_JSON_SCALAR_TYPES = frozenset((str, int, float, bool, type(None)))
+
+def _json_key(key):
+    # json.dumps turns non-string keys into strings; keep its spelling for them.
+    if isinstance(key, str) and not isinstance(key, Enum):
+        return key
+    if key is None or isinstance(key, bool):
+        return json.dumps(key)
+    if isinstance(key, (int, float)) and not isinstance(key, Enum):
+        return json.dumps(key)
+    return str(to_jsonable(key))
+
+def to_jsonable(obj):
+    """
+    Convert `obj` to plain JSON types (dict, list, str, numbers, None) in one
+    pass, with the same conversions as CustomJSONEncoder and no string in between.
+    Pydantic models are read field by field rather than through .dict().
+    """
+    cls = type(obj)
+    if cls in _JSON_SCALAR_TYPES:
+        return obj
+    if cls is list or cls is tuple:
+        return [to_jsonable(value) for value in obj]
+    if cls is dict:
+        return {_json_key(key): to_jsonable(value) for key, value in obj.items()}
+    if cls is datetime:
+        return obj.isoformat()
+    if isinstance(obj, BaseModel):
+        # Most fields are scalars; skip the call for them.
+        scalar_types = _JSON_SCALAR_TYPES
+        return {
+            key: value if type(value) in scalar_types else to_jsonable(value)
+            for key, value in obj.__dict__.items()
+        }
+    if isinstance(obj, Enum):
+        return to_jsonable(obj.value)
+    if isinstance(obj, dict):
+        return {_json_key(key): to_jsonable(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return [to_jsonable(value) for value in obj]
+    if isinstance(obj, (str, int, float)):
+        return obj
+    return custom_json_serializer(obj)
+
 class BaseModelWithCustomJSON(BaseModel):
     class Config:
         json_encoders = {
@@ -34,8 +84,18 @@ class BaseModelWithCustomJSON(BaseModel):
         }
 
     def json(self, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.dumps(self.dict(), default=custom_json_serializer,
+                                    option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+            except TypeError:
+                pass  # e.g. an int beyond 64 bits; the stdlib encoder handles it
         return json.dumps(self.dict(), cls=CustomJSONEncoder, **kwargs)
 
+    def to_jsonable(self) -> Dict[str, Any]:
+        """Return this model as a JSON-compatible dict, e.g. for a toolResult block."""
+        return to_jsonable(self)
+
 # Pydantic models
 class TodoCreate(BaseModelWithCustomJSON):
     content: str = Field(..., min_length=1, max_length=1000)
@@ -61,6 +121,13 @@ class OKROut(BaseModelWithCustomJSON):
 class OKROutList(BaseModelWithCustomJSON):
     okrs: List[OKROut]
 
+class OKRTitle(BaseModelWithCustomJSON):
+    id: str
+    title: str
+
+class OKRTitleList(BaseModelWithCustomJSON):
+    okrs: List[OKRTitle]
+
 class TaskCreate(BaseModelWithCustomJSON):
     name: str
     description: Optional[str] = None
@@ -83,9 +150,36 @@ class TaskOut(BaseModelWithCustomJSON):
 class TaskList(BaseModelWithCustomJSON):
     tasks: List[TaskOut]
 
+# Projections of TaskOut: list tools that only need some fields request only those.
+class TaskName(BaseModelWithCustomJSON):
+    id: str
+    name: str
+
+class TaskNameList(BaseModelWithCustomJSON):
+    tasks: List[TaskName]
+
+class TaskSummary(BaseModelWithCustomJSON):
+    id: str
+    name: str
+    estimated_time_mins: Optional[int] = None
+    priority: Optional[int] = None
+    tags: Optional[List[str]] = None
+    scheduled_date_utc: Optional[int] = None
+
+class TaskSummaryList(BaseModelWithCustomJSON):
+    tasks: List[TaskSummary]
+
 class NullModel(BaseModelWithCustomJSON):
     value: None = None
 
+class TaskFilter(BaseModelWithCustomJSON):
+    tags: Optional[List[str]] = None  # Tasks carrying every one of these tags
+    priority_min: Optional[int] = None
+    priority_max: Optional[int] = None
+    scheduled_after: Optional[int] = None  # UTC seconds, inclusive
+    scheduled_before: Optional[int] = None  # UTC seconds, inclusive
+    text: Optional[str] = None  # Case-sensitive substring of the name or description
+
 class DirectoryInput(BaseModelWithCustomJSON):
     directory: str
 
@@ -97,6 +191,7 @@ class CurrentDateTime(BaseModelWithCustomJSON):
 
 class InputDatetimePlaintext(BaseModelWithCustomJSON):
     input_dt: str
+    timezone: Optional[str] = None  # IANA zone, e.g. "US/Pacific"; defaults to local time
 
 class DatetimeMillis(BaseModelWithCustomJSON):
     datetime_millis: str
@@ -104,6 +199,16 @@ class DatetimeMillis(BaseModelWithCustomJSON):
 class DatetimeSeconds(BaseModelWithCustomJSON):
     datetime_seconds: str
 
+class InputDatetimePlaintextList(BaseModelWithCustomJSON):
+    input_dts: List[str]
+    timezone: Optional[str] = None
+
+class DatetimeMillisList(BaseModelWithCustomJSON):
+    datetime_millis: List[Optional[str]]  # None where a phrase could not be parsed
+
+class DatetimeSecondsList(BaseModelWithCustomJSON):
+    datetime_seconds: List[Optional[str]]
+
 class DeleteTaskInput(BaseModelWithCustomJSON):
     id: str    
 
@@ -119,9 +224,27 @@ class UpdateTaskInput(BaseModelWithCustomJSON):
     tags: Optional[List[str]] = None
     scheduled_date_utc: Optional[int] = None    
 
+class TaskCreateBatch(BaseModelWithCustomJSON):
+    tasks: List[TaskCreate]
+
+class UpdateTaskBatch(BaseModelWithCustomJSON):
+    updates: List[UpdateTaskInput]
+
+class TaskIdBatch(BaseModelWithCustomJSON):
+    ids: List[str]
+
+class TaskBatchItemResult(BaseModelWithCustomJSON):
+    index: int  # Position of the item in the request batch
+    task: Optional[TaskOut] = None
+    error: Optional[str] = None
+
+class TaskBatchResult(BaseModelWithCustomJSON):
+    results: List[TaskBatchItemResult]
+
 
 class UTCSecondsList(BaseModelWithCustomJSON):
     utc_seconds: List[int]
+    timezone: str = 'US/Pacific'  # IANA zone to render the dates in
 
 class HumanReadableDateList(BaseModelWithCustomJSON):
     dates: List[str]
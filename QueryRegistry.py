@@ -0,0 +1,151 @@
+from typing import Dict, List, Any, Optional, Iterator
+import hashlib
+import threading
+import weakref
+from gql import GraphQLRequest
+from graphql import parse, print_ast, validate
+
+
+################################################################################
+##
+## Every GraphQL document the access layer sends is registered here.
+##
+##     LIST_OKRS = query("""query ListOKRs(...) { ... }""")
+##
+## Registration parses the document and prints its canonical text once, and
+## computes the sha256 of that text: the id of the document in the Automatic
+## Persisted Queries (APQ) protocol. A RegisteredQuery is a gql GraphQLRequest,
+## so it can still be passed to a plain gql session.
+##
+## GraphQLConnection validates each document once per schema (validated_for),
+## instead of gql validating it on every execute, and sends the hash in place
+## of the text when the server supports persisted queries.
+##
+## The APQ request shapes are
+##
+##     {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": h}}, "variables": ...}
+##     {"query": text, "extensions": {"persistedQuery": {...}}, "variables": ...}
+##
+## and a server that has not seen `h` yet answers the first with a
+## PersistedQueryNotFound error, after which the client sends the second.
+
+PERSISTED_QUERY_VERSION = 1
+PERSISTED_QUERY_NOT_FOUND = "PERSISTED_QUERY_NOT_FOUND"
+PERSISTED_QUERY_NOT_SUPPORTED = "PERSISTED_QUERY_NOT_SUPPORTED"
+
+
+class RegisteredQuery(GraphQLRequest):
+    def __init__(self, source: str):
+        document = parse(source)
+        super().__init__(document)
+        self.text = print_ast(document)
+        self.sha256 = hashlib.sha256(self.text.encode("utf-8")).hexdigest()
+        self.operation_name = next(
+            (definition.name.value for definition in document.definitions
+             if getattr(definition, "name", None) is not None),
+            None,
+        )
+        self._validated = weakref.WeakSet()  # Schemas this document passed validation against
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        # Used when passed to a plain gql session: the full text, printed once.
+        payload = {"query": self.text}
+        if self.operation_name:
+            payload["operationName"] = self.operation_name
+        return payload
+
+    def validated_for(self, schema) -> None:
+        """
+        Validate against `schema`, the first time this document is used with it.
+
+        Raises:
+            graphql.GraphQLError: The first validation error, as gql would raise it.
+        """
+        if schema in self._validated:
+            return
+        errors = validate(schema, self.document)
+        if errors:
+            raise errors[0]
+        self._validated.add(schema)
+
+    def request(self, variable_values: Optional[Dict[str, Any]] = None,
+                include_text: bool = True, persisted: bool = False) -> "QueryExecution":
+        """The request for one execution, with or without the text and the APQ hash."""
+        return QueryExecution(self, variable_values, include_text, persisted)
+
+
+class QueryExecution(GraphQLRequest):
+    """One execution of a RegisteredQuery, as handed to the gql transport."""
+    def __init__(self, query: RegisteredQuery, variable_values: Optional[Dict[str, Any]],
+                 include_text: bool, persisted: bool):
+        super().__init__(query.document, variable_values=variable_values, operation_name=query.operation_name)
+        self.query = query
+        self.include_text = include_text
+        self.persisted = persisted
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        payload = {}
+        if self.include_text:
+            payload["query"] = self.query.text
+        if self.operation_name:
+            payload["operationName"] = self.operation_name
+        if self.variable_values:
+            payload["variables"] = self.variable_values
+        if self.persisted:
+            payload["extensions"] = {"persistedQuery": {"version": PERSISTED_QUERY_VERSION,
+                                                        "sha256Hash": self.query.sha256}}
+        return payload
+
+
+def error_code(error: Dict[str, Any]) -> Optional[str]:
+    """The APQ error code of a GraphQL error, if it is one (by code or by message)."""
+    code = (error.get("extensions") or {}).get("code")
+    if code:
+        return code
+    message = error.get("message")
+    if message == "PersistedQueryNotFound":
+        return PERSISTED_QUERY_NOT_FOUND
+    if message == "PersistedQueryNotSupported":
+        return PERSISTED_QUERY_NOT_SUPPORTED
+    return None
+
+
+class QueryRegistry:
+    def __init__(self):
+        self._queries = {}  # sha256 -> RegisteredQuery
+        self._lock = threading.Lock()
+
+    def register(self, source: str) -> RegisteredQuery:
+        """Parse and register a document; registering the same text again returns the same query."""
+        registered = RegisteredQuery(source)
+        with self._lock:
+            return self._queries.setdefault(registered.sha256, registered)
+
+    def get(self, sha256: str) -> Optional[RegisteredQuery]:
+        return self._queries.get(sha256)
+
+    def validate_all(self, schema) -> List[str]:
+        """Validate every registered document against `schema`; returns the failures as messages."""
+        failures = []
+        for registered in list(self._queries.values()):
+            try:
+                registered.validated_for(schema)
+            except Exception as e:
+                failures.append(f"{registered.operation_name or registered.sha256[:12]}: {e}")
+        return failures
+
+    def __iter__(self) -> Iterator[RegisteredQuery]:
+        return iter(list(self._queries.values()))
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+
+registry = QueryRegistry()
+
+
+def query(source: str) -> RegisteredQuery:
+    """Register a document with the process-wide registry; use in place of gql()."""
+    return registry.register(source)
@@ -0,0 +1,98 @@
+from typing import Dict, List, Any, Iterable, Tuple, Type
+from datetime import datetime
+from functools import lru_cache
+from PydanticTaskModels import *
+
+
+################################################################################
+##
+## Decoding GraphQL records into the output models.
+##
+## Records returned by our own AppSync API already have the right shape and
+## types, so by default a decoder only converts the AWSDateTime strings and
+## builds the model the way `construct` does, skipping pydantic validation. Pass
+## validate=True (or set TRUST_SERVER_DATA = False) to run full validation,
+## e.g. when pointing the client at an unfamiliar endpoint.
+
+TRUST_SERVER_DATA = True
+
+
+def parse_aws_datetime(value: str) -> datetime:
+    """Parse an AWSDateTime such as '2024-05-01T12:00:00.000Z' into an aware datetime."""
+    if value[-1:] == 'Z':
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value)
+
+
+class ModelDecoder:
+    def __init__(self, model: Type[BaseModelWithCustomJSON], datetime_fields: Tuple[str, ...] = ("createdAt", "updatedAt")):
+        """
+        Args:
+            model: The output model to build, e.g. TaskOut.
+            datetime_fields: Fields that arrive as AWSDateTime strings.
+        """
+        self.model = model
+        if hasattr(model, "model_fields"):
+            fields = model.model_fields
+            self._defaults = {name: field.default for name, field in fields.items() if not field.is_required()}
+        else:
+            fields = model.__fields__
+            self._defaults = {name: field.default for name, field in fields.items() if not field.required}
+        self.fields = tuple(fields)
+        self.datetime_fields = tuple(name for name in datetime_fields if name in fields)
+        self._field_names = frozenset(fields)
+        self._pydantic_v2 = hasattr(model, "model_construct")
+
+    def __call__(self, record: Dict[str, Any], validate: bool = False):
+        """
+        Build one model from a GraphQL record.
+
+        Args:
+            record (dict): The record as returned by the API.
+            validate (bool): Run full pydantic validation instead of the trusted fast path.
+        """
+        values = dict(record)
+        for field in self.datetime_fields:
+            value = values.get(field)
+            if isinstance(value, str):
+                values[field] = parse_aws_datetime(value)
+        if validate or not TRUST_SERVER_DATA:
+            return self.model(**values)
+        return self._construct(values)
+
+    def _construct(self, values: Dict[str, Any]):
+        # What `construct` does, without its per-call introspection: fill in
+        # defaults, drop unknown keys (e.g. __typename) and set the instance
+        # state directly.
+        fields_set = set(values)
+        if fields_set != self._field_names:
+            fields_set &= self._field_names
+            values = {
+                name: values[name] if name in values else self._defaults[name]
+                for name in self.fields
+                if name in values or name in self._defaults
+            }
+
+        if not self._pydantic_v2:
+            return self.model.construct(_fields_set=fields_set, **values)
+        instance = self.model.__new__(self.model)
+        object.__setattr__(instance, '__dict__', values)
+        object.__setattr__(instance, '__pydantic_fields_set__', fields_set)
+        object.__setattr__(instance, '__pydantic_extra__', None)
+        object.__setattr__(instance, '__pydantic_private__', None)
+        return instance
+
+    def many(self, records: Iterable[Dict[str, Any]], validate: bool = False) -> List[Any]:
+        """Decode a list of records, e.g. one listTasks page."""
+        return [self(record, validate) for record in records]
+
+
+@lru_cache(maxsize=None)
+def decoder_for(model: Type[BaseModelWithCustomJSON]) -> ModelDecoder:
+    """The shared decoder for `model`, e.g. a projection such as TaskName."""
+    return ModelDecoder(model)
+
+
+decode_task = decoder_for(TaskOut)
+decode_okr = decoder_for(OKROut)
+decode_todo = decoder_for(TodoOut)
@@ -0,0 +1,309 @@
+from typing import Dict, List, Any, Optional
+from datetime import datetime, timedelta
+import base64
+import gzip
+import json
+import os
+import pickle
+import sqlite3
+import zlib
+
+
+################################################################################
+##
+## Saved chat sessions.
+##
+## Each session's conversation history lives in its own file under
+## `saved_sessions/`. A small SQLite index next to them holds what the session
+## chooser shows (id, title, turn count, last update), so listing, paging and
+## searching never open a history file; a history is read only once its session
+## is selected.
+##
+## History files are append-only journals (`session_<id>.jsonl`, or `.jsonl.gz`
+## when compressed). Each line is one record:
+##
+##     {"append": [messages...]}   messages added since the previous record
+##     {"reset": [messages...]}    the full history, replacing everything before
+##
+## A save appends only the new messages and fsyncs, so a turn costs O(turn)
+## bytes and a crash can at worst lose the torn last record, which is skipped on
+## load. When the history was rewritten rather than extended (e.g. after `/s`),
+## or every COMPACT_EVERY records, the journal is compacted into a single reset
+## record written to a temporary file and swapped in with os.replace.
+
+SESSIONS_DIR = "saved_sessions"
+TITLE_MAX_LEN = 60
+COMPACT_EVERY = 50
+
+
+def _encode(obj):
+    # Converse messages are JSON apart from raw bytes (e.g. document or image sources).
+    if isinstance(obj, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(obj).decode("ascii")}
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+def _decode(obj):
+    if len(obj) == 1 and "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    return obj
+
+
+def read_journal(path: str) -> List[Dict[str, Any]]:
+    """Replay a journal file into a conversation history, skipping a torn last record."""
+    opener = gzip.open if path.endswith(".gz") else open
+    history = []
+    try:
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line, object_hook=_decode)
+                except ValueError:
+                    break  # Torn write at the end of the journal
+                if "reset" in record:
+                    history = record["reset"]
+                else:
+                    history.extend(record["append"])
+    except (EOFError, gzip.BadGzipFile, zlib.error):
+        pass  # Truncated final gzip member; keep what was read
+    return history
+
+
+def session_title(conversation_history: List[Dict[str, Any]]) -> str:
+    """Use the first text the user typed as the session title."""
+    for message in conversation_history:
+        if message.get("role") != "user":
+            continue
+        for block in message.get("content", []):
+            if "text" in block:
+                title = " ".join(block["text"].split())
+                return title if len(title) <= TITLE_MAX_LEN else title[:TITLE_MAX_LEN - 3] + "..."
+    return ""
+
+
+def count_turns(conversation_history: List[Dict[str, Any]]) -> int:
+    """Count user turns; tool results are sent as user messages but are not turns."""
+    return sum(
+        1 for message in conversation_history
+        if message.get("role") == "user" and any("text" in block for block in message.get("content", []))
+    )
+
+
+class SessionStore:
+    def __init__(self, directory: str = SESSIONS_DIR, compress: bool = False):
+        """
+        Args:
+            directory (str): Where session journals and the index live.
+            compress (bool): Write new journals gzip-compressed.
+        """
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.directory = directory
+        self.compress = compress
+        # session_id -> (journaled message count, first message, last message, records)
+        self._journaled = {}
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"))
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, title TEXT, turn_count INTEGER, last_updated TEXT)"
+            )
+        self._index_unindexed_files()
+
+    def _pickle_path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"session_{session_id}.pickle")
+
+    def _journal_path(self, session_id: str) -> str:
+        """The existing journal for a session, or where a new one should go."""
+        plain = os.path.join(self.directory, f"session_{session_id}.jsonl")
+        compressed = plain + ".gz"
+        if os.path.exists(compressed) or (self.compress and not os.path.exists(plain)):
+            return compressed
+        return plain
+
+    def _index_unindexed_files(self) -> None:
+        # One-off migration: pickled sessions saved before the index existed are read once.
+        indexed = {row[0] for row in self._conn.execute("SELECT session_id FROM sessions")}
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith("session_") and filename.endswith(".pickle")):
+                continue
+            session_id = filename[8:-7]  # Remove "session_" prefix and ".pickle" suffix
+            if session_id in indexed:
+                continue
+            with open(os.path.join(self.directory, filename), "rb") as f:
+                session_data = pickle.load(f)
+            self._index(session_id, session_data["conversation_history"],
+                        session_data.get("last_updated", ""))
+
+    def convert_pickles(self) -> int:
+        """
+        Rewrite every pickled session as a journal and delete the pickle.
+
+        Returns:
+            int: The number of sessions converted.
+        """
+        converted = 0
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith("session_") and filename.endswith(".pickle")):
+                continue
+            session_id = filename[8:-7]
+            with open(os.path.join(self.directory, filename), "rb") as f:
+                session_data = pickle.load(f)
+            self._compact(session_id, session_data["conversation_history"])  # Also removes the pickle
+            converted += 1
+        return converted
+
+    def _index(self, session_id: str, conversation_history: List[Dict[str, Any]], last_updated: str) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, title, turn_count, last_updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET title = excluded.title, "
+                "turn_count = excluded.turn_count, last_updated = excluded.last_updated",
+                (session_id, session_title(conversation_history), count_turns(conversation_history), last_updated),
+            )
+
+    def count(self, search: Optional[str] = None) -> int:
+        """Return the number of sessions, optionally only those whose title matches `search`."""
+        if search:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE title LIKE ?", (f"%{search}%",)
+            ).fetchone()
+        else:
+            row = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+        return row[0]
+
+    def list_sessions(self, limit: int = 10, offset: int = 0, search: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Return one page of session metadata, most recently updated first.
+
+        Args:
+            limit (int): Page size.
+            offset (int): Number of sessions to skip.
+            search (str, optional): Only sessions whose title contains this text.
+
+        Returns:
+            A list of dicts with session_id, title, turn_count and last_updated.
+        """
+        query = "SELECT session_id, title, turn_count, last_updated FROM sessions"
+        params = []
+        if search:
+            query += " WHERE title LIKE ?"
+            params.append(f"%{search}%")
+        query += " ORDER BY last_updated DESC LIMIT ? OFFSET ?"
+        params += [limit, offset]
+
+        return [
+            {"session_id": row[0], "title": row[1], "turn_count": row[2], "last_updated": row[3]}
+            for row in self._conn.execute(query, params)
+        ]
+
+    def load_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Read the full conversation history of one session."""
+        journal_path = self._journal_path(session_id)
+        if os.path.exists(journal_path):
+            history = read_journal(journal_path)
+        else:
+            with open(self._pickle_path(session_id), "rb") as f:
+                history = pickle.load(f)["conversation_history"]
+
+        # Start the session from a clean single-record journal; this also drops a
+        # torn last record so later appends do not land after it.
+        self._compact(session_id, history)
+        return history
+
+    def save(self, session_id: str, conversation_history: List[Dict[str, Any]]) -> None:
+        """
+        Persist a session. If the history only grew since the last save, just the
+        new messages are appended; otherwise the journal is compacted.
+        """
+        state = self._journaled.get(session_id)
+        if state is not None and self._extends(conversation_history, state) and state[3] < COMPACT_EVERY:
+            new_messages = conversation_history[state[0]:]
+            if new_messages:
+                self._append(session_id, {"append": new_messages})
+            self._remember(session_id, conversation_history, records=state[3] + 1)
+        else:
+            self._compact(session_id, conversation_history)
+
+        self._index(session_id, conversation_history, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+    @staticmethod
+    def _extends(conversation_history, state) -> bool:
+        # The caller extends the same list in place, so the journaled prefix keeps its
+        # message objects; anything else (truncation, summarising) means a rewrite.
+        count, first, last, _ = state
+        if count == 0:
+            return True
+        return (len(conversation_history) >= count
+                and conversation_history[0] is first
+                and conversation_history[count - 1] is last)
+
+    def _remember(self, session_id, conversation_history, records):
+        first = conversation_history[0] if conversation_history else None
+        last = conversation_history[-1] if conversation_history else None
+        self._journaled[session_id] = (len(conversation_history), first, last, records)
+
+    def _append(self, session_id, record) -> None:
+        path = self._journal_path(session_id)
+        data = (json.dumps(record, default=_encode) + "\n").encode("utf-8")
+        if path.endswith(".gz"):
+            data = gzip.compress(data)  # Each append is its own gzip member
+        with open(path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _compact(self, session_id, conversation_history) -> None:
+        """Atomically replace the journal with a single reset record."""
+        path = self._journal_path(session_id)
+        data = (json.dumps({"reset": conversation_history}, default=_encode) + "\n").encode("utf-8")
+        if path.endswith(".gz"):
+            data = gzip.compress(data)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        pickle_path = self._pickle_path(session_id)
+        if os.path.exists(pickle_path):
+            os.remove(pickle_path)
+        self._remember(session_id, conversation_history, records=1)
+
+    def delete(self, session_id: str) -> None:
+        self._journaled.pop(session_id, None)
+        for path in (self._journal_path(session_id), self._pickle_path(session_id)):
+            if os.path.exists(path):
+                os.remove(path)
+        with self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def prune(self, older_than_days: Optional[int] = None, keep_latest: Optional[int] = None) -> int:
+        """
+        Delete old sessions and return how many were removed.
+
+        Args:
+            older_than_days (int, optional): Remove sessions not updated in this many days.
+            keep_latest (int, optional): Always keep this many of the most recent sessions.
+        """
+        rows = self._conn.execute(
+            "SELECT session_id, last_updated FROM sessions ORDER BY last_updated DESC"
+        ).fetchall()
+        cutoff = None
+        if older_than_days is not None:
+            cutoff = (datetime.now() - timedelta(days=older_than_days)).strftime("%Y-%m-%d %H:%M:%S")
+
+        removed = 0
+        for position, (session_id, last_updated) in enumerate(rows):
+            if keep_latest is not None and position < keep_latest:
+                continue
+            if cutoff is not None and last_updated >= cutoff:
+                continue
+            if cutoff is None and keep_latest is None:
+                continue
+            self.delete(session_id)
+            removed += 1
+        return removed
@@ -1,4 +1,4 @@
-from typing import Dict, List, Any, Optional, Union, Tuple
+from typing import Dict, List, Any, Optional, Union, Tuple, Iterator, AsyncIterator
 from typing_extensions import Annotated
 from pydantic import BaseModel, Field
 from datetime import datetime, timedelta
@@ -6,7 +6,15 @@ from enum import Enum
 import json
 from gql import gql, Client
 from gql.transport.requests import RequestsHTTPTransport
+from gql.transport.exceptions import TransportQueryError
+from functools import lru_cache
 from PydanticTaskModels import *
+from LocalReplica import Replica
+from ListAccess import ListQuery, AsyncListAccess, FULL_SYNC_INTERVAL, DEFAULT_PAGE_SIZE
+from ResponseDecoders import decode_task, decoder_for
+from QueryRegistry import query
+from ModelFilters import matches_filter
+import asyncio
 
 ################################################################################
 ##
@@ -17,8 +25,7 @@ from PydanticTaskModels import *
 #    \ \_\  \ \_\ \_\  \/\_____\  \ \_\ \_\  \/\_____\ 
 #     \/_/   \/_/\/_/   \/_____/   \/_/\/_/   \/_____/ 
 
-
-CREATE_TASK = gql("""
+CREATE_TASK = query("""
 mutation CreateTask($input: CreateTaskInput!) {
   createTask(input: $input) {
     id
@@ -34,9 +41,10 @@ mutation CreateTask($input: CreateTaskInput!) {
 }
 """)
 
-LIST_TASKS = gql("""
-query ListTasks {
-  listTasks {
+LIST_TASKS = query("""
+query ListTasks($filter: ModelTaskFilterInput, $limit: Int, $nextToken: String) {
+  listTasks(filter: $filter, limit: $limit, nextToken: $nextToken) {
+    nextToken
     items {
       id
       name
@@ -52,7 +60,7 @@ query ListTasks {
 }
 """)
 
-DELETE_TASK = gql("""
+DELETE_TASK = query("""
 mutation DeleteTask($input: DeleteTaskInput!) {
   deleteTask(input: $input) {
     id
@@ -68,7 +76,7 @@ mutation DeleteTask($input: DeleteTaskInput!) {
 }
 """)
 
-UPDATE_TASK = gql("""
+UPDATE_TASK = query("""
 mutation UpdateTask($input: UpdateTaskInput!) {
   updateTask(input: $input) {
     id
@@ -85,74 +93,352 @@ mutation UpdateTask($input: UpdateTaskInput!) {
 """)
 
 
-class Task:
-    def __init__(self, client):
-        self.client = client
+################################################################################
+## Batched mutations
+##
+## N mutations are packed into one document as aliased fields (op0, op1, ...),
+## each with its own $inputN variable. Batches are split into chunks so a single
+## request stays under the backend's request-size and resolver limits.
+
+BATCH_MAX_ITEMS = 25
+BATCH_MAX_BYTES = 256 * 1024
+BATCH_MIN_INTERVAL = 0.0  # Seconds to wait between chunks, to respect rate limits
+
+TASK_FIELDS = """
+    id
+    name
+    description
+    estimated_time_mins
+    priority
+    tags
+    scheduled_date_utc
+    createdAt
+    updatedAt
+"""
+
+
+@lru_cache(maxsize=None)
+def _batch_mutation(mutation: str, input_type: str, count: int):
+    """Build (once per size) a document that runs `mutation` `count` times."""
+    variables = ", ".join(f"$input{i}: {input_type}!" for i in range(count))
+    operations = "".join(
+        f"  op{i}: {mutation}(input: $input{i}) {{{TASK_FIELDS}  }}\n" for i in range(count)
+    )
+    return query(f"mutation Batch{mutation[0].upper()}{mutation[1:]}({variables}) {{\n{operations}}}")
+
+
+def _chunk_inputs(inputs: List[Dict[str, Any]], max_items: int, max_bytes: int):
+    """Split inputs into (index, input) chunks bounded by item count and JSON size."""
+    chunk, size = [], 0
+    for index, item in enumerate(inputs):
+        item_size = len(json.dumps(item))
+        if chunk and (len(chunk) >= max_items or size + item_size > max_bytes):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append((index, item))
+        size += item_size
+    if chunk:
+        yield chunk
+
+
+################################################################################
+## Filtering
+##
+## A TaskFilter becomes the `filter` argument of listTasks, so only matching
+## Tasks are returned. The backend reads a page and then filters it, so pages
+## of a filtered listing may be short or empty; the listing follows nextToken
+## regardless.
+
+def _range_condition(low: Optional[int], high: Optional[int]) -> Optional[Dict[str, Any]]:
+    if low is not None and high is not None:
+        return {"between": [low, high]}
+    if low is not None:
+        return {"ge": low}
+    if high is not None:
+        return {"le": high}
+    return None
+
+
+def task_filter_input(task_filter: Optional[TaskFilter]) -> Optional[Dict[str, Any]]:
+    """
+    Translate a TaskFilter into a ModelTaskFilterInput dict.
+
+    Returns:
+        The filter, or None if `task_filter` is None, a NullModel, or sets no criteria.
+    """
+    if task_filter is None or isinstance(task_filter, NullModel):
+        return None
+
+    conditions = []
+    for tag in task_filter.tags or []:
+        conditions.append({"tags": {"contains": tag}})
+    priority = _range_condition(task_filter.priority_min, task_filter.priority_max)
+    if priority:
+        conditions.append({"priority": priority})
+    scheduled = _range_condition(task_filter.scheduled_after, task_filter.scheduled_before)
+    if scheduled:
+        conditions.append({"scheduled_date_utc": scheduled})
+    if task_filter.text:
+        conditions.append({"or": [{"name": {"contains": task_filter.text}},
+                                  {"description": {"contains": task_filter.text}}]})
+
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"and": conditions}
+
 
-    def create_task(self, task_input: TaskCreate) -> TaskOut:
+################################################################################
+## Field projection
+##
+## A projection is an output model with a subset of TaskOut's fields, such as
+## TaskName or TaskSummary. Documents that select only its fields are generated
+## once per field set, so unused fields (e.g. long descriptions) are neither
+## sent nor decoded. Passing TaskOut uses the full documents above. List
+## documents come from TASK_LIST (see ListAccess); mutations are built here.
+
+TASK_LIST = ListQuery("listTasks", "ModelTaskFilterInput", LIST_TASKS, TaskOut)
+
+FULL_TASK_DOCUMENTS = {
+    "createTask": CREATE_TASK,
+    "updateTask": UPDATE_TASK,
+    "deleteTask": DELETE_TASK,
+}
+
+TASK_INPUT_TYPES = {
+    "createTask": "CreateTaskInput",
+    "updateTask": "UpdateTaskInput",
+    "deleteTask": "DeleteTaskInput",
+}
+
+
+@lru_cache(maxsize=None)
+def _projected_document(operation: str, fields: Tuple[str, ...]):
+    selection = "".join(f"      {field}\n" for field in fields)
+    name = operation[0].upper() + operation[1:]
+    return query(
+        f"mutation {name}($input: {TASK_INPUT_TYPES[operation]}!) {{\n"
+        f"  {operation}(input: $input) {{\n{selection}  }}\n}}"
+    )
+
+
+def task_document(operation: str, projection=TaskOut):
+    """
+    The document for `operation` (listTasks, createTask, updateTask or deleteTask)
+    selecting the fields of `projection`.
+
+    Raises:
+        ValueError: If the projection has fields that a Task does not.
+    """
+    if operation == "listTasks":
+        return TASK_LIST.document(projection)
+    if projection is TaskOut:
+        return FULL_TASK_DOCUMENTS[operation]
+    fields = decoder_for(projection).fields
+    unknown = set(fields) - set(decode_task.fields)
+    if unknown:
+        raise ValueError(f"{projection.__name__} is not a projection of TaskOut: {', '.join(sorted(unknown))}")
+    return _projected_document(operation, fields)
+
+
+class AsyncTask(AsyncListAccess):
+    """
+    Tasks on the GraphQL API. With a replica (see AsyncListAccess), list_tasks
+    is served from the local copy and mutations write through to it.
+    """
+    list_query = TASK_LIST
+
+    def _mutation_document(self, operation: str, projection):
+        # The replica stores whole records, so writing through needs every field.
+        return task_document(operation, TaskOut if self.replica is not None else projection)
+
+    async def create_task(self, task_input: TaskCreate, projection=TaskOut) -> TaskOut:
         """
         Create a new Task and send it to the GraphQL API.
 
         Args:
             task_input (TaskCreate): The input data for creating a new Task.
+            projection: The model to return, e.g. TaskName; only its fields are requested.
 
         Returns:
-            TaskOut: The created Task.
+            TaskOut: The created Task (as `projection`).
         """
         variables = {
             "input": task_input.dict(exclude_none=True)
         }
 
-        result = self.client.execute(CREATE_TASK, variable_values=variables)
+        result = await self.client.execute(self._mutation_document("createTask", projection),
+                                           variable_values=variables)
 
         created_task = result['createTask']
+        if self.replica is not None:
+            self.replica.upsert([created_task])
+
+        return decoder_for(projection)(created_task)
+
+    async def _execute_batch(self, mutation: str, input_type: str, inputs: List[Dict[str, Any]],
+                             write_through) -> TaskBatchResult:
+        results = []
+        for n, chunk in enumerate(_chunk_inputs(inputs, BATCH_MAX_ITEMS, BATCH_MAX_BYTES)):
+            if n and BATCH_MIN_INTERVAL:
+                await asyncio.sleep(BATCH_MIN_INTERVAL)
+
+            document = _batch_mutation(mutation, input_type, len(chunk))
+            variables = {f"input{i}": item for i, (_, item) in enumerate(chunk)}
 
-        return TaskOut(
-            id=created_task['id'],
-            name=created_task['name'],
-            description=created_task['description'],
-            estimated_time_mins=created_task['estimated_time_mins'],
-            priority=created_task['priority'],
-            tags=created_task['tags'],
-            scheduled_date_utc=created_task['scheduled_date_utc'],
-            createdAt=datetime.fromisoformat(created_task['createdAt'].replace('Z', '+00:00')),
-            updatedAt=datetime.fromisoformat(created_task['updatedAt'].replace('Z', '+00:00'))
-        )
+            # A failing item only fails its own alias; the rest of the data still arrives.
+            errors = {}
+            try:
+                data = await self.client.execute(document, variable_values=variables)
+            except TransportQueryError as e:
+                data = e.data or {}
+                for error in e.errors or []:
+                    path = error.get('path') or [None]
+                    errors.setdefault(path[0], error.get('message', str(error)))
+            except Exception as e:
+                results.extend(TaskBatchItemResult(index=index, error=str(e)) for index, _ in chunk)
+                continue
 
-    def list_tasks(self, nm: NullModel) -> TaskList:
+            for i, (index, _) in enumerate(chunk):
+                record = data.get(f"op{i}")
+                if record is None:
+                    error = errors.get(f"op{i}") or errors.get(None) or "No result returned"
+                    results.append(TaskBatchItemResult(index=index, error=error))
+                else:
+                    if self.replica is not None:
+                        write_through(record)
+                    results.append(TaskBatchItemResult(index=index, task=decode_task(record)))
+
+        return TaskBatchResult(results=results)
+
+    async def create_tasks(self, batch: TaskCreateBatch) -> TaskBatchResult:
         """
-        List all Tasks from the GraphQL API.
+        Create many Tasks with as few GraphQL round-trips as possible.
+
+        Args:
+            batch (TaskCreateBatch): The Tasks to create.
 
         Returns:
-            TaskList: A list of all Tasks wrapped in a TaskList object.
-        """
-        result = self.client.execute(LIST_TASKS)
-
-        tasks = result['listTasks']['items']
-        task_list = [
-            TaskOut(
-                id=task['id'],
-                name=task['name'],
-                description=task['description'],
-                estimated_time_mins=task['estimated_time_mins'],
-                priority=task['priority'],
-                tags=task['tags'],
-                scheduled_date_utc=task['scheduled_date_utc'],
-                createdAt=datetime.fromisoformat(task['createdAt'].replace('Z', '+00:00')),
-                updatedAt=datetime.fromisoformat(task['updatedAt'].replace('Z', '+00:00'))
-            ) for task in tasks
-        ]
-        return TaskList(tasks=task_list)
-
-    def delete_task(self, task_id: TaskId) -> TaskOut:
+            TaskBatchResult: One result per input, in input order, holding either
+                the created Task or the error for that item.
+        """
+        inputs = [task_input.dict(exclude_none=True) for task_input in batch.tasks]
+        return await self._execute_batch("createTask", "CreateTaskInput", inputs,
+                                   lambda record: self.replica.upsert([record]))
+
+    async def update_tasks(self, batch: UpdateTaskBatch) -> TaskBatchResult:
+        """
+        Update many Tasks with as few GraphQL round-trips as possible.
+
+        Args:
+            batch (UpdateTaskBatch): The updates to apply.
+
+        Returns:
+            TaskBatchResult: One result per input, in input order.
+        """
+        inputs = [update_input.dict(exclude_none=True) for update_input in batch.updates]
+        return await self._execute_batch("updateTask", "UpdateTaskInput", inputs,
+                                   lambda record: self.replica.upsert([record]))
+
+    async def delete_tasks(self, batch: TaskIdBatch) -> TaskBatchResult:
+        """
+        Delete many Tasks with as few GraphQL round-trips as possible.
+
+        Args:
+            batch (TaskIdBatch): The IDs of the Tasks to delete.
+
+        Returns:
+            TaskBatchResult: One result per input, in input order, holding the
+                deleted Task or the error for that item.
+        """
+        inputs = [{"id": task_id} for task_id in batch.ids]
+        return await self._execute_batch("deleteTask", "DeleteTaskInput", inputs,
+                                   lambda record: self.replica.delete(record['id']))
+
+    async def iter_tasks(self, page_size: int = DEFAULT_PAGE_SIZE,
+                         task_filter: Optional[TaskFilter] = None,
+                         projection=TaskOut) -> AsyncIterator[TaskOut]:
+        """
+        Iterate over all Tasks from the GraphQL API, one page at a time.
+
+        Follows `nextToken` until the backend reports no further pages, so only
+        a single page of results is held in memory at once.
+
+        Args:
+            page_size (int): The number of Tasks requested per page.
+            task_filter (TaskFilter, optional): Only yield Tasks matching this filter.
+            projection: The model to yield, e.g. TaskSummary; only its fields are requested.
+
+        Yields:
+            TaskOut: Each Task (as `projection`), in the order returned by the API.
+        """
+        decode = decoder_for(projection)
+        async for task in self._iter_records(page_size, filter=task_filter_input(task_filter),
+                                             projection=projection):
+            yield decode(task)
+
+    async def project_tasks(self, projection=TaskOut, task_filter: Optional[TaskFilter] = None) -> List[Any]:
+        """
+        List Tasks from the GraphQL API as `projection`, optionally only those matching a filter.
+
+        With a replica configured, Tasks are read locally after an incremental
+        sync (skipped while the replica is younger than `sync_interval`), and
+        the same filter is applied to the local records. A projection skips a
+        cold replica, one that would need a full sync, and requests only its
+        own fields from the API; the next full listing fills the replica.
+
+        Args:
+            projection: TaskOut, or a model with a subset of its fields.
+            task_filter (TaskFilter, optional): Tags, priority range, scheduled
+                window and text to match. None (or a NullModel) lists every Task.
+        """
+        if self.replica is None or (projection is not TaskOut and self._replica_is_cold()):
+            return [task async for task in self.iter_tasks(task_filter=task_filter, projection=projection)]
+
+        records = await self._replica_records()
+        model_filter = task_filter_input(task_filter)
+        if model_filter:
+            records = [record for record in records if matches_filter(record, model_filter)]
+        return decoder_for(projection).many(records)
+
+    async def list_tasks(self, task_filter: Optional[TaskFilter] = None) -> TaskList:
+        """
+        List Tasks from the GraphQL API, optionally only those matching a filter.
+
+        Returns:
+            TaskList: The matching Tasks wrapped in a TaskList object.
+        """
+        return TaskList(tasks=await self.project_tasks(TaskOut, task_filter))
+
+    async def list_task_names(self, task_filter: Optional[TaskFilter] = None) -> TaskNameList:
+        """
+        List only the ID and name of matching Tasks, e.g. to pick one to act on.
+
+        Returns:
+            TaskNameList: The matching Tasks as TaskName objects.
+        """
+        return TaskNameList(tasks=await self.project_tasks(TaskName, task_filter))
+
+    async def list_task_summaries(self, task_filter: Optional[TaskFilter] = None) -> TaskSummaryList:
+        """
+        List matching Tasks without their description and timestamps.
+
+        Returns:
+            TaskSummaryList: The matching Tasks as TaskSummary objects.
+        """
+        return TaskSummaryList(tasks=await self.project_tasks(TaskSummary, task_filter))
+
+    async def delete_task(self, task_id: TaskId, projection=TaskOut) -> TaskOut:
         """
         Delete a Task from the GraphQL API.
 
         Args:
             task_id (TaskId): The ID of the task to delete.
+            projection: The model to return, e.g. TaskName for a confirmation.
 
         Returns:
-            TaskOut: The deleted Task.
+            TaskOut: The deleted Task (as `projection`).
         """
         variables = {
             "input": {
@@ -160,48 +446,94 @@ class Task:
             }
         }
 
-        result = self.client.execute(DELETE_TASK, variable_values=variables)
+        result = await self.client.execute(task_document("deleteTask", projection), variable_values=variables)
 
         deleted_task = result['deleteTask']
+        if self.replica is not None:
+            self.replica.delete(task_id.id)
 
-        return TaskOut(
-            id=deleted_task['id'],
-            name=deleted_task['name'],
-            description=deleted_task['description'],
-            estimated_time_mins=deleted_task['estimated_time_mins'],
-            priority=deleted_task['priority'],
-            tags=deleted_task['tags'],
-            scheduled_date_utc=deleted_task['scheduled_date_utc'],
-            createdAt=datetime.fromisoformat(deleted_task['createdAt'].replace('Z', '+00:00')),
-            updatedAt=datetime.fromisoformat(deleted_task['updatedAt'].replace('Z', '+00:00'))
-        )
+        return decoder_for(projection)(deleted_task)
 
-    def update_task(self, update_input: UpdateTaskInput) -> TaskOut:
+    async def update_task(self, update_input: UpdateTaskInput, projection=TaskOut) -> TaskOut:
         """
         Update a Task in the GraphQL API.
 
         Args:
             update_input (UpdateTaskInput): The input data for updating the task.
+            projection: The model to return, e.g. TaskName; only its fields are requested.
 
         Returns:
-            TaskOut: The updated Task.
+            TaskOut: The updated Task (as `projection`).
         """
         variables = {
             "input": update_input.dict(exclude_none=True)
         }
 
-        result = self.client.execute(UPDATE_TASK, variable_values=variables)
+        result = await self.client.execute(self._mutation_document("updateTask", projection),
+                                           variable_values=variables)
 
         updated_task = result['updateTask']
+        if self.replica is not None:
+            self.replica.upsert([updated_task])
+
+        return decoder_for(projection)(updated_task)
+
+
+class Task:
+    """
+    Blocking wrapper around AsyncTask, for callers without an event loop
+    (bosbct.py, the tool functions in sbctcli.py).
+    """
+    def __init__(self, connection, replica: Optional[Replica] = None, sync_interval: float = 60.0,
+                 full_sync_interval: float = FULL_SYNC_INTERVAL):
+        """
+        Args:
+            connection (GraphQLConnection): The shared connection to run requests on.
+            replica (Replica, optional): See AsyncTask.
+            sync_interval (float): See AsyncTask.
+            full_sync_interval (float): See AsyncTask.
+        """
+        self.connection = connection
+        self.async_task = AsyncTask(connection, replica=replica, sync_interval=sync_interval,
+                                   full_sync_interval=full_sync_interval)
+
+    @property
+    def replica(self) -> Optional[Replica]:
+        return self.async_task.replica
+
+    def create_task(self, task_input: TaskCreate, projection=TaskOut) -> TaskOut:
+        return self.connection.run(self.async_task.create_task(task_input, projection))
+
+    def create_tasks(self, batch: TaskCreateBatch) -> TaskBatchResult:
+        return self.connection.run(self.async_task.create_tasks(batch))
+
+    def update_tasks(self, batch: UpdateTaskBatch) -> TaskBatchResult:
+        return self.connection.run(self.async_task.update_tasks(batch))
+
+    def delete_tasks(self, batch: TaskIdBatch) -> TaskBatchResult:
+        return self.connection.run(self.async_task.delete_tasks(batch))
+
+    def iter_tasks(self, page_size: int = DEFAULT_PAGE_SIZE,
+                   task_filter: Optional[TaskFilter] = None, projection=TaskOut) -> Iterator[TaskOut]:
+        return self.connection.iterate(self.async_task.iter_tasks(page_size, task_filter, projection))
+
+    def sync(self, full: bool = False) -> None:
+        return self.connection.run(self.async_task.sync(full))
+
+    def project_tasks(self, projection=TaskOut, task_filter: Optional[TaskFilter] = None) -> List[Any]:
+        return self.connection.run(self.async_task.project_tasks(projection, task_filter))
+
+    def list_tasks(self, task_filter: Optional[TaskFilter] = None) -> TaskList:
+        return self.connection.run(self.async_task.list_tasks(task_filter))
+
+    def list_task_names(self, task_filter: Optional[TaskFilter] = None) -> TaskNameList:
+        return self.connection.run(self.async_task.list_task_names(task_filter))
+
+    def list_task_summaries(self, task_filter: Optional[TaskFilter] = None) -> TaskSummaryList:
+        return self.connection.run(self.async_task.list_task_summaries(task_filter))
+
+    def delete_task(self, task_id: TaskId, projection=TaskOut) -> TaskOut:
+        return self.connection.run(self.async_task.delete_task(task_id, projection))
 
-        return TaskOut(
-            id=updated_task['id'],
-            name=updated_task['name'],
-            description=updated_task['description'],
-            estimated_time_mins=updated_task['estimated_time_mins'],
-            priority=updated_task['priority'],
-            tags=updated_task['tags'],
-            scheduled_date_utc=updated_task['scheduled_date_utc'],
-            createdAt=datetime.fromisoformat(updated_task['createdAt'].replace('Z', '+00:00')),
-            updatedAt=datetime.fromisoformat(updated_task['updatedAt'].replace('Z', '+00:00'))
-        )
+    def update_task(self, update_input: UpdateTaskInput, projection=TaskOut) -> TaskOut:
+        return self.connection.run(self.async_task.update_task(update_input, projection))
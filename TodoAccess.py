@@ -7,9 +7,11 @@ import json
 from gql import gql, Client
 from gql.transport.requests import RequestsHTTPTransport
 from PydanticTaskModels import *
+from ResponseDecoders import decode_todo
+from QueryRegistry import query
 
 # GraphQL mutations
-CREATE_TODO = gql("""
+CREATE_TODO = query("""
 mutation CreateTodo($input: CreateTodoInput!) {
     createTodo(input: $input) {
         id
@@ -20,11 +22,15 @@ mutation CreateTodo($input: CreateTodoInput!) {
 }
 """)
 
-class Todo:
+class AsyncTodo:
     def __init__(self, client):
+        """
+        Args:
+            client: An async gql session, or a GraphQLConnection shared with other access classes.
+        """
         self.client = client
 
-    def create_todo(self, todo_input: TodoCreate) -> TodoOut:
+    async def create_todo(self, todo_input: TodoCreate) -> TodoOut:
         """
         Create a new Todo task and send it to the GraphQL API.
         
@@ -40,13 +46,23 @@ class Todo:
             }
         }
         
-        result = self.client.execute(CREATE_TODO, variable_values=variables)
+        result = await self.client.execute(CREATE_TODO, variable_values=variables)
         
         created_todo = result['createTodo']
         
-        return TodoOut(
-            id=created_todo['id'],
-            content=created_todo['content'],
-            createdAt=datetime.fromisoformat(created_todo['createdAt'].replace('Z', '+00:00')),
-            updatedAt=datetime.fromisoformat(created_todo['updatedAt'].replace('Z', '+00:00'))
-        )
+        return decode_todo(created_todo)
+
+class Todo:
+    """
+    Blocking wrapper around AsyncTodo, for callers without an event loop.
+    """
+    def __init__(self, connection):
+        """
+        Args:
+            connection (GraphQLConnection): The shared connection to run requests on.
+        """
+        self.connection = connection
+        self.async_todo = AsyncTodo(connection)
+
+    def create_todo(self, todo_input: TodoCreate) -> TodoOut:
+        return self.connection.run(self.async_todo.create_todo(todo_input))
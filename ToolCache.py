@@ -0,0 +1,81 @@
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+from collections import OrderedDict
+import threading
+import time
+
+
+################################################################################
+##
+## Memoized tool results.
+##
+## Each tool has its own LRU of (input key -> result, expiry), sized and timed
+## by the tool's "cache" settings in function_io_map. Mutating tools list the
+## read tools they make stale under "invalidates"; process_tool_call clears
+## those entries around every mutation.
+##
+## Tool calls run concurrently, so a read may fetch its result before a
+## mutation and store it after the mutation has cleared the cache. Every
+## invalidation therefore bumps the tool's generation; a read takes the
+## generation before it calls the tool, and put() drops its result if the
+## generation has moved on since.
+
+class ToolCache:
+    def __init__(self):
+        self._entries = {}  # tool name -> OrderedDict(key -> (expires_at, result))
+        self._generations = {}  # tool name -> number of invalidations
+        self._hits = {}
+        self._misses = {}
+        self._lock = threading.Lock()
+
+    def get(self, tool_name: str, key: str) -> Tuple[bool, Any]:
+        """Return (True, result) for a live entry, otherwise (False, None)."""
+        with self._lock:
+            entries = self._entries.get(tool_name)
+            entry = entries.get(key) if entries is not None else None
+            if entry is not None and entry[0] > time.monotonic():
+                entries.move_to_end(key)
+                self._hits[tool_name] = self._hits.get(tool_name, 0) + 1
+                return True, entry[1]
+            if entry is not None:
+                del entries[key]
+            self._misses[tool_name] = self._misses.get(tool_name, 0) + 1
+            return False, None
+
+    def generation(self, tool_name: str) -> int:
+        """The tool's current generation, to pass to put() after the call."""
+        with self._lock:
+            return self._generations.get(tool_name, 0)
+
+    def put(self, tool_name: str, key: str, result: Any, ttl: float, max_entries: int,
+            generation: Optional[int] = None) -> None:
+        """
+        Store a result. With `generation` (from generation(), taken before the
+        tool was called) nothing is stored if the tool was invalidated since.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generations.get(tool_name, 0):
+                return
+            entries = self._entries.setdefault(tool_name, OrderedDict())
+            entries[key] = (time.monotonic() + ttl, result)
+            entries.move_to_end(key)
+            while len(entries) > max_entries:
+                entries.popitem(last=False)
+
+    def invalidate(self, tool_names: Iterable[str]) -> None:
+        with self._lock:
+            for tool_name in tool_names:
+                self._entries.pop(tool_name, None)
+                self._generations[tool_name] = self._generations.get(tool_name, 0) + 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-tool hit, miss and current entry counts."""
+        with self._lock:
+            names = set(self._hits) | set(self._misses) | set(self._entries)
+            return {
+                name: {
+                    "hits": self._hits.get(name, 0),
+                    "misses": self._misses.get(name, 0),
+                    "entries": len(self._entries.get(name, ())),
+                }
+                for name in sorted(names)
+            }
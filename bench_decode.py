@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import gc
+import time
+from datetime import datetime, timedelta, timezone
+from PydanticTaskModels import *
+from ResponseDecoders import decode_task
+from TaskAccess import AsyncTask
+
+
+################################################################################
+##
+## Benchmark for decoding listTasks responses into TaskOut.
+##
+##     python bench_decode.py --rows 20000
+##
+## Reports rows per second for the validated and trusted decoders on their own,
+## and for AsyncTask.list_tasks end to end against an in-memory client that
+## serves pre-built pages, so no network time is included.
+
+def make_records(count: int):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    records = []
+    for i in range(count):
+        stamp = (start + timedelta(seconds=i)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        records.append({
+            "id": f"task-{i}",
+            "name": f"Task {i}",
+            "description": "Benchmark task with a reasonably long description " * 2,
+            "estimated_time_mins": 30,
+            "priority": i % 5,
+            "tags": ["bench", f"group-{i % 10}"],
+            "scheduled_date_utc": 1704067200 + i,
+            "createdAt": stamp,
+            "updatedAt": stamp,
+        })
+    return records
+
+
+class PagedClient:
+    """Answers listTasks from memory, `limit` records per page."""
+    def __init__(self, records):
+        self.records = records
+
+    async def execute(self, document, variable_values=None):
+        limit = variable_values["limit"]
+        offset = int(variable_values.get("nextToken") or 0)
+        next_offset = offset + limit
+        return {"listTasks": {
+            "items": self.records[offset:next_offset],
+            "nextToken": str(next_offset) if next_offset < len(self.records) else None,
+        }}
+
+
+def rows_per_second(label: str, rows: int, fn, repeat: int) -> None:
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<28} {rows / best:>12,.0f} rows/s  ({best * 1000:.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure listTasks decode throughput.")
+    parser.add_argument("--rows", type=int, default=10000, help="Records per run")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the best is reported")
+    args = parser.parse_args()
+
+    records = make_records(args.rows)
+    async_task = AsyncTask(PagedClient(records))
+
+    loop = asyncio.new_event_loop()
+    rows_per_second("decode (validated)", args.rows, lambda: decode_task.many(records, validate=True), args.repeat)
+    rows_per_second("decode (trusted)", args.rows, lambda: decode_task.many(records), args.repeat)
+    rows_per_second("list_tasks end to end", args.rows,
+                    lambda: loop.run_until_complete(async_task.list_tasks()), args.repeat)
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
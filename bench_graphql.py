@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from PydanticTaskModels import *
+from GraphQLSession import GraphQLConnection
+from LocalAppSync import LocalAppSync, SCHEMA_FILE
+from TaskAccess import AsyncTask
+from OKRAccess import AsyncOKR
+from TodoAccess import AsyncTodo
+
+
+################################################################################
+##
+## Benchmarks for the GraphQL access classes against LocalAppSync.
+##
+##     python bench_graphql.py --sizes 100,1000,10000 --latency-ms 20
+##     python bench_graphql.py --json results.json   # keep for later comparison
+##
+## For every dataset size a fresh server is seeded with that many Tasks and
+## OKRs, and each operation is run `--iterations` times (list operations
+## `--list-iterations` times) through one shared GraphQLConnection, with up to
+## `--concurrency` calls in flight. Reported per operation: p50/p90/p99/max
+## latency in ms and throughput in calls per second.
+
+OPERATIONS = ["create_task", "update_task", "delete_task", "create_todo", "list_tasks", "list_tasks_filtered",
+              "list_task_names", "list_okrs"]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def measure(call, count: int, concurrency: int) -> Dict[str, float]:
+    """Run `call(i)` for i in range(count), `concurrency` at a time; summarize latencies."""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(i):
+        async with semaphore:
+            started = time.perf_counter()
+            await call(i)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(count)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "calls": count,
+        "p50_ms": percentile(latencies, 0.50),
+        "p90_ms": percentile(latencies, 0.90),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": latencies[-1],
+        "mean_ms": statistics.fmean(latencies),
+        "calls_per_sec": count / elapsed,
+    }
+
+
+async def run_size(size: int, args) -> Dict[str, Dict[str, float]]:
+    server = LocalAppSync(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000)
+    server.seed(tasks=size, okrs=size).start()
+    connection = GraphQLConnection(server.endpoint, "local", schema_file=SCHEMA_FILE,
+                                   persisted_queries=False if args.full_text else None)
+    tasks, okrs, todos = AsyncTask(connection), AsyncOKR(connection), AsyncTodo(connection)
+    seeded_ids = list(server.tables["tasks"])
+    created_ids = []
+
+    async def create_task(i):
+        created = await tasks.create_task(TaskCreate(name=f"Bench task {i}", priority=3, tags=["bench"]))
+        created_ids.append(created.id)
+
+    async def update_task(i):
+        await tasks.update_task(UpdateTaskInput(id=seeded_ids[i % len(seeded_ids)], priority=i % 5 + 1))
+
+    async def delete_task(i):
+        await tasks.delete_task(TaskId(id=created_ids[i]))
+
+    calls = {
+        "create_task": create_task,
+        "update_task": update_task,
+        "delete_task": delete_task,
+        "create_todo": lambda i: todos.create_todo(TodoCreate(content=f"Bench todo {i}")),
+        "list_tasks": lambda i: tasks.list_tasks(),
+        "list_tasks_filtered": lambda i: tasks.list_tasks(TaskFilter(tags=["work"], priority_max=2)),
+        "list_task_names": lambda i: tasks.list_task_names(),
+        "list_okrs": lambda i: okrs.list_okrs(NullModel()),
+    }
+
+    results = {}
+    try:
+        await connection.session()  # Connect before timing anything
+        for name in args.operations:
+            if name == "update_task" and not seeded_ids:
+                continue
+            count = args.list_iterations if name.startswith("list_") else args.iterations
+            if name == "delete_task":
+                count = min(count, len(created_ids))  # Deletes what create_task made
+                if not count:
+                    continue
+            results[name] = await measure(calls[name], count, args.concurrency)
+    finally:
+        await connection.close()
+        server.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the GraphQL access classes against LocalAppSync.")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Comma-separated numbers of seeded Tasks/OKRs")
+    parser.add_argument("--iterations", type=int, default=200, help="Calls per single-record operation")
+    parser.add_argument("--list-iterations", type=int, default=10, help="Calls per list operation")
+    parser.add_argument("--concurrency", type=int, default=1, help="Calls in flight at once")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency the server adds to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra latency, up to this much")
+    parser.add_argument("--operations", default=",".join(OPERATIONS), help="Comma-separated operations to run")
+    parser.add_argument("--full-text", action="store_true", help="Send query text instead of persisted-query hashes")
+    parser.add_argument("--json", metavar="FILE", help="Also write the results as JSON")
+    args = parser.parse_args()
+    args.operations = [name for name in args.operations.split(",") if name]
+    unknown = set(args.operations) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+
+    all_results = {}
+    print(f"{'size':>7} {'operation':<19} {'calls':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'calls/s':>9}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        results = asyncio.run(run_size(size, args))
+        all_results[str(size)] = results
+        for name, r in results.items():
+            print(f"{size:>7} {name:<19} {r['calls']:>6} {r['p50_ms']:>8.2f} {r['p90_ms']:>8.2f} "
+                  f"{r['p99_ms']:>8.2f} {r['max_ms']:>8.2f} {r['calls_per_sec']:>9.1f}")
+        sys.stdout.flush()
+
+    if args.json:
+        settings = {key: value for key, value in vars(args).items() if key != "json"}
+        with open(args.json, "w") as f:
+            json.dump({"settings": settings, "results": all_results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
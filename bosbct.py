@@ -9,22 +9,64 @@ from PydanticTaskModels import *
 from TaskAccess import *
 from TodoAccess import *
 from OKRAccess  import *
+from GraphQLSession import GraphQLConnection
 
 import os
+import sys
 
 
 ENDPOINT = os.environ["BOSBCT_ENDPOINT"] 
 API_KEY  = os.environ["BOSBCT_API_KEY"]
 
-transport = RequestsHTTPTransport(
-    url=ENDPOINT,
-    headers={'x-api-key': API_KEY},
-    use_json=True,
-)
+# One pooled async session shared by every access class. The schema comes from
+# BOSBCT_SCHEMA_FILE if set, otherwise from the on-disk introspection cache.
+connection = GraphQLConnection(ENDPOINT, API_KEY, schema_file=os.environ.get("BOSBCT_SCHEMA_FILE"))
+task_client = Task(connection)
+todo_client = Todo(connection)
+okr_client  = OKR(connection)
 
-client = Client(transport=transport, fetch_schema_from_transport=True)
-task_client = Task(client)
-todo_client = Todo(client)
-okr_client  = OKR(client)
 
+################################################################################
+## Bulk export
 
+def export_jsonl(items, out):
+    """
+    Stream pydantic models to `out` as JSON Lines, one model per line.
+
+    Args:
+        items: An iterable of models, e.g. `task_client.iter_tasks()`.
+        out: A writable text file object.
+
+    Returns:
+        int: The number of records written.
+    """
+    count = 0
+    for item in items:
+        out.write(item.json())
+        out.write("\n")
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Tasks or OKRs as JSON Lines.")
+    parser.add_argument("kind", choices=["tasks", "okrs"], help="What to export")
+    parser.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Records requested per page")
+    args = parser.parse_args()
+
+    if args.kind == "tasks":
+        items = task_client.iter_tasks(page_size=args.page_size)
+    else:
+        items = okr_client.iter_okrs(page_size=args.page_size)
+
+    if args.output == "-":
+        count = export_jsonl(items, sys.stdout)
+    else:
+        with open(args.output, "w") as out:
+            count = export_jsonl(items, out)
+    print(f"Exported {count} {args.kind}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
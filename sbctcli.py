@@ -1,86 +1,122 @@
-from time import time
+import time
+_process_start = time.perf_counter()
+
 from typing import Dict, List, Any, Optional, Tuple, Union
 from typing_extensions import Annotated
 from pydantic import BaseModel, Field, ValidationError
 
 ################################################################################
+## Heavy modules (boto3, dateparser, pytz, requests, prompt_toolkit, gql, most
+## of rich) and all clients are only loaded on first use; see "Lazy startup".
 from rich.console import Console
 from rich.panel import Panel
-from rich.markdown import Markdown
-from rich.table import Table
-from rich.text import Text
-from rich.style import Style
-from rich.theme import Theme
 
 ################################################################################
 
 import json
-import boto3
-import requests
+import hashlib
 from datetime import datetime, timedelta
-import pytz
-import dateparser
 import os
+import sys
 import uuid
-import pickle
-import yaml
 import copy
 import base64
+import functools
+import subprocess
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 
 from PydanticTaskModels import *
+from ToolCache import ToolCache
+from BlobStore import inline_documents, externalize_documents
+from Metrics import metrics, COUNT_BUCKETS
+from PromptCache import with_cache_point, add_history_cache_points, caching_unsupported, cache_hit_ratio, supports_caching
 
-from rich.console import Console
-from rich.panel import Panel
-from rich.markdown import Markdown
+################################################################################
+## Lazy startup
+##
+## Everything that is not needed to show the first prompt is created on first
+## use. `python sbctcli.py --startup-report` prints an import-time breakdown and
+## checks the time-to-import against SBCT_STARTUP_BUDGET_MS.
+
+STARTUP_BUDGET_MS = float(os.environ.get("SBCT_STARTUP_BUDGET_MS", "400"))
+
+# First-use cost (ms) of each lazily created resource, by name.
+startup_timings = {}
+
+_lazy_lock = threading.RLock()
 
+def lazy(factory):
+    """Decorator: build the value on the first call (thread-safe), then reuse it."""
+    value = []
 
-from prompt_toolkit.key_binding import KeyBindings
-from prompt_toolkit import prompt
-from prompt_toolkit.keys import Keys
-from prompt_toolkit.filters import Condition
-from prompt_toolkit import PromptSession
-from prompt_toolkit.formatted_text import ANSI, HTML
-from prompt_toolkit.styles import Style
+    @functools.wraps(factory)
+    def get():
+        if not value:
+            with _lazy_lock:
+                if not value:
+                    started = time.perf_counter()
+                    value.append(factory())
+                    startup_timings[factory.__name__] = (time.perf_counter() - started) * 1000
+        return value[0]
+
+    return get
 
 ################################################################################
 ##
 def get_current_datetime(NullModel) -> CurrentDateTime:
+    import pytz
     return CurrentDateTime(current_datetime=datetime.now(pytz.timezone('US/Pacific')))
 
 def plaintext_datetime_to_millis(pt: InputDatetimePlaintext) -> DatetimeMillis:
-    parsed_start_date = dateparser.parse(pt.input_dt)
+    from DateParsing import parse_datetime
+    parsed_start_date = parse_datetime(pt.input_dt, pt.timezone)
     if parsed_start_date:
         return DatetimeMillis(datetime_millis=str(int(parsed_start_date.timestamp() * 1000)))
     return None
 
 
 def plaintext_datetime_to_seconds(pt: InputDatetimePlaintext) -> DatetimeSeconds:
-    parsed_start_date = dateparser.parse(pt.input_dt)
+    from DateParsing import parse_datetime
+    parsed_start_date = parse_datetime(pt.input_dt, pt.timezone)
     if parsed_start_date:
         return DatetimeSeconds(datetime_seconds=str(int(parsed_start_date.timestamp())))
     return None
 
 
-def utc_seconds_to_human_readable_datetime(input_list: UTCSecondsList) -> HumanReadableDateList:
-    human_readable_dates = []
-    pacific_tz = pytz.timezone('US/Pacific')
+def plaintext_datetimes_to_millis(pts: InputDatetimePlaintextList) -> DatetimeMillisList:
+    from DateParsing import parse_datetimes
+    parsed_dates = parse_datetimes(pts.input_dts, pts.timezone)
+    return DatetimeMillisList(datetime_millis=[
+        str(int(parsed.timestamp() * 1000)) if parsed else None for parsed in parsed_dates
+    ])
+
+
+def plaintext_datetimes_to_seconds(pts: InputDatetimePlaintextList) -> DatetimeSecondsList:
+    from DateParsing import parse_datetimes
+    parsed_dates = parse_datetimes(pts.input_dts, pts.timezone)
+    return DatetimeSecondsList(datetime_seconds=[
+        str(int(parsed.timestamp())) if parsed else None for parsed in parsed_dates
+    ])
 
-    for utc_seconds in input_list.utc_seconds:
-        # Convert UTC seconds to datetime object
-        utc_dt = datetime.utcfromtimestamp(utc_seconds)
 
-        # Make the datetime object timezone-aware (UTC)
-        utc_dt = pytz.utc.localize(utc_dt)
+def utc_seconds_to_human_readable_datetime(input_list: UTCSecondsList) -> HumanReadableDateList:
+    from DateParsing import format_epoch_seconds
+    return HumanReadableDateList(dates=format_epoch_seconds(input_list.utc_seconds, input_list.timezone))
 
-        # Convert to Pacific Time
-        pacific_dt = utc_dt.astimezone(pacific_tz)
 
-        # Format the date
-        formatted_date = pacific_dt.strftime('%Y-%m-%d %I:%M:%S %p %Z')
-        human_readable_dates.append(formatted_date)
+# External APIs share one pooled session with timeouts and retries (HTTPClient.py).
+HN_HTTP_CACHE_TTL = 60
+# Longer than the slowest failing HTTPClient GET with the default settings
+# (three 3.05 s connect attempts with backoff, one 10 s read), so an HTTP tool
+# that times out has already given up on its request (see run_tool_calls).
+HTTP_TOOL_TIMEOUT_SECS = 20
 
-    return HumanReadableDateList(dates=human_readable_dates)
+@lazy
+def get_http_client():
+    from HTTPClient import HTTPClient
+    return HTTPClient()
 
 
 def fetch_hn_front_page(nm: NullModel) -> HNBlob:
@@ -93,12 +129,8 @@ def fetch_hn_front_page(nm: NullModel) -> HNBlob:
     Returns:
         HNBlob: A Pydantic model containing the search results with title and URL (if available).
     """
-    import requests
-
     url = "https://hn.algolia.com/api/v1/search?tags=front_page"
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
+    data = get_http_client().get_json(url, ttl=HN_HTTP_CACHE_TTL)
 
     # Extract title and URL (if available) from each hit, skipping those without URLs
     simplified_hits = [
@@ -112,29 +144,56 @@ def fetch_hn_front_page(nm: NullModel) -> HNBlob:
 
 ################################################################################
 ## The models we made
-from TaskAccess import *
-from TodoAccess import *
-from OKRAccess  import *
 
 ENDPOINT = os.environ["BOSBCT_ENDPOINT"] 
 API_KEY  = os.environ["BOSBCT_API_KEY"]
 
-transport = RequestsHTTPTransport(
-    url=ENDPOINT,
-    headers={'x-api-key': API_KEY},
-    use_json=True,
+# Tasks and OKRs are mirrored locally so repeated list calls skip the network.
+# The default file is keyed by endpoint, so switching endpoints never serves
+# another backend's records.
+REPLICA_PATH = os.environ.get(
+    "BOSBCT_REPLICA_PATH", f"replica-{hashlib.sha256(ENDPOINT.encode('utf-8')).hexdigest()[:16]}.sqlite3"
 )
 
-client = Client(transport=transport, fetch_schema_from_transport=True)
-task_client = Task(client)
-todo_client = Todo(client)
-okr_client  = OKR(client)
+@lazy
+def get_connection():
+    """
+    One pooled async session shared by every access class. The schema comes from
+    BOSBCT_SCHEMA_FILE if set, otherwise from the on-disk introspection cache.
+    """
+    from GraphQLSession import GraphQLConnection
+    return GraphQLConnection(ENDPOINT, API_KEY, schema_file=os.environ.get("BOSBCT_SCHEMA_FILE"))
+
+@lazy
+def get_task_client():
+    from TaskAccess import Task
+    from LocalReplica import Replica
+    return Task(get_connection(), replica=Replica(REPLICA_PATH, "tasks"))
+
+@lazy
+def get_todo_client():
+    from TodoAccess import Todo
+    return Todo(get_connection())
+
+@lazy
+def get_okr_client():
+    from OKRAccess import OKR
+    from LocalReplica import Replica
+    return OKR(get_connection(), replica=Replica(REPLICA_PATH, "okrs"))
+
+def client_method(get_client, method_name):
+    """A tool function that calls `method_name` on a lazily created access client."""
+    def call(model):
+        return getattr(get_client(), method_name)(model)
+    call.__name__ = method_name
+    return call
+
 ################################################################################
 ##
 
 def get_random_dad_joke(nm: NullModel) -> DadJoke:
-    r = requests.get(url="https://icanhazdadjoke.com/", headers={"Accept" : "application/json"})
-    rj = r.json()
+    # Every call should be a new joke, so this one is never cached.
+    rj = get_http_client().get_json("https://icanhazdadjoke.com/", headers={"Accept" : "application/json"})
     return DadJoke(joke_id = rj['id'], joke_contents = rj['joke'])
 
 
@@ -143,18 +202,30 @@ def get_random_dad_joke(nm: NullModel) -> DadJoke:
 ################################################################################
 ## Creating a set of tool schemas so I can use it for an agent
 
+# The cached read tools over Tasks; every Task mutation makes them stale.
+TASK_LIST_TOOLS = ["list_tasks", "list_task_summaries", "list_task_names"]
+
 function_io_map = {
     "get_current_datetime": {
         "input": NullModel,
         "output": CurrentDateTime,
         "description": "Returns the current date and time in the US Pacific Time Zone.",
-        "function": get_current_datetime
+        "function": get_current_datetime,
+        "cache": {"ttl": 1, "max_entries": 1}
     },
     "list_okrs" : {
         "input" : NullModel,
         "output" : OKROutList,
         "description" : "Lists all current OKRs",
-        "function" : okr_client.list_okrs
+        "function" : client_method(get_okr_client, "list_okrs"),
+        "cache" : {"ttl": 60, "max_entries": 1}
+    },
+    "list_okr_titles": {
+        "input": NullModel,
+        "output": OKRTitleList,
+        "description": "Lists the ID and title of every OKR, without descriptions. Use this when the titles are enough.",
+        "function": client_method(get_okr_client, "list_okr_titles"),
+        "cache": {"ttl": 60, "max_entries": 1}
     },
     "plaintext_datetime_to_millis": {
         "input": InputDatetimePlaintext,
@@ -168,34 +239,85 @@ function_io_map = {
         "description": "Converts a human-readable date/time string to seconds since epoch. Useful for ClickUp API interactions.",
         "function": plaintext_datetime_to_seconds
     },        
+    "plaintext_datetimes_to_millis": {
+        "input": InputDatetimePlaintextList,
+        "output": DatetimeMillisList,
+        "description": "Converts a list of human-readable date/time strings to milliseconds since epoch, in order. Prefer this over repeated plaintext_datetime_to_millis calls. Unparseable entries are null.",
+        "function": plaintext_datetimes_to_millis
+    },
+    "plaintext_datetimes_to_seconds": {
+        "input": InputDatetimePlaintextList,
+        "output": DatetimeSecondsList,
+        "description": "Converts a list of human-readable date/time strings to seconds since epoch, in order. Prefer this over repeated plaintext_datetime_to_seconds calls. Unparseable entries are null.",
+        "function": plaintext_datetimes_to_seconds
+    },
     "create_task": {
         "input": TaskCreate,
         "output": TaskOut,
         "description": "Creates a new Task and sends it to the GraphQL API.",
-        "function": task_client.create_task
+        "function": client_method(get_task_client, "create_task"),
+        "invalidates": TASK_LIST_TOOLS
     },
     "list_tasks": {
-        "input": NullModel,
+        "input": TaskFilter,
         "output": TaskList,
-        "description": "Lists all Tasks from the GraphQL API.",
-        "function": task_client.list_tasks
+        "description": "Lists Tasks from the GraphQL API. All filter fields are optional and combined with AND: tags (every tag must be present), priority_min/priority_max, scheduled_after/scheduled_before (UTC seconds, inclusive) and text (case-sensitive match in the name or description). Filter here instead of listing everything.",
+        "function": client_method(get_task_client, "list_tasks"),
+        "cache": {"ttl": 60, "max_entries": 16}
+    },
+    "list_task_summaries": {
+        "input": TaskFilter,
+        "output": TaskSummaryList,
+        "description": "Like list_tasks, but returns each Task without its description and timestamps (id, name, estimated_time_mins, priority, tags, scheduled_date_utc). Prefer this unless the descriptions are needed.",
+        "function": client_method(get_task_client, "list_task_summaries"),
+        "cache": {"ttl": 60, "max_entries": 16}
+    },
+    "list_task_names": {
+        "input": TaskFilter,
+        "output": TaskNameList,
+        "description": "Like list_tasks, but returns only the id and name of each Task, e.g. to find the ID of a Task to update or delete.",
+        "function": client_method(get_task_client, "list_task_names"),
+        "cache": {"ttl": 60, "max_entries": 16}
     },
     "delete_task": {
         "input": TaskId,
         "output": TaskOut,
         "description": "Deletes a Task from the GraphQL API.",
-        "function": task_client.delete_task
+        "function": client_method(get_task_client, "delete_task"),
+        "invalidates": TASK_LIST_TOOLS
     },
     "update_task": {
         "input": UpdateTaskInput,
         "output": TaskOut,
         "description": "Updates an existing Task in the GraphQL API.",
-        "function": task_client.update_task
+        "function": client_method(get_task_client, "update_task"),
+        "invalidates": TASK_LIST_TOOLS
+    },
+    "create_tasks": {
+        "input": TaskCreateBatch,
+        "output": TaskBatchResult,
+        "description": "Creates many Tasks in one request. Prefer this over repeated create_task calls. Errors are reported per item.",
+        "function": client_method(get_task_client, "create_tasks"),
+        "invalidates": TASK_LIST_TOOLS
+    },
+    "update_tasks": {
+        "input": UpdateTaskBatch,
+        "output": TaskBatchResult,
+        "description": "Updates many existing Tasks in one request. Errors are reported per item.",
+        "function": client_method(get_task_client, "update_tasks"),
+        "invalidates": TASK_LIST_TOOLS
+    },
+    "delete_tasks": {
+        "input": TaskIdBatch,
+        "output": TaskBatchResult,
+        "description": "Deletes many Tasks by ID in one request. Errors are reported per item.",
+        "function": client_method(get_task_client, "delete_tasks"),
+        "invalidates": TASK_LIST_TOOLS
     },
     "utc_seconds_to_human_readable_datetime": {
         "input": UTCSecondsList,
         "output": HumanReadableDateList,
-        "description": "Converts a list of UTC seconds to human-readable dates in Pacific Time Zone.",
+        "description": "Converts a list of UTC seconds to human-readable dates, in the Pacific Time Zone unless another IANA timezone is given.",
         "function": utc_seconds_to_human_readable_datetime
     },    
 }
@@ -204,14 +326,18 @@ function_io_map["fetch_hn_front_page"] = {
     "input": NullModel,
     "output": HNBlob,
     "description": "Fetches the front page articles from Hacker News using the Algolia API.",
-    "function": fetch_hn_front_page
+    "function": fetch_hn_front_page,
+    "timeout": HTTP_TOOL_TIMEOUT_SECS,
+    # No longer than the HTTP cache, so the ETag revalidation below it still runs.
+    "cache": {"ttl": HN_HTTP_CACHE_TTL, "max_entries": 1}
 }
 
 function_io_map["get_random_dad_joke"] = {
     "input": NullModel,
     "output": DadJoke,
     "description": "Fetch a random dad joke",
-    "function": get_random_dad_joke
+    "function": get_random_dad_joke,
+    "timeout": HTTP_TOOL_TIMEOUT_SECS
 }
 
 def pydantic_to_json_schema(model: BaseModel) -> Dict[str, Any]:
@@ -221,21 +347,25 @@ def pydantic_to_json_schema(model: BaseModel) -> Dict[str, Any]:
         schema.pop(key, None)
     return schema
 
-# Now, let's create the array of tools
-tools = []
+# Now, let's create the array of tools. It is built once, on the first Converse call.
+@lazy
+def get_tools():
+    tools = []
 
-for func_name, func_info in function_io_map.items():
-    input_type = func_info['input']
-    output_type = func_info['output']
-    description = func_info['description']
-    
-    tool = {
-        "name": func_name,
-        "description": description,
-        "inputSchema": { "json" : pydantic_to_json_schema(input_type) }
-    }
-    
-    tools.append({"toolSpec" : tool})
+    for func_name, func_info in function_io_map.items():
+        input_type = func_info['input']
+        output_type = func_info['output']
+        description = func_info['description']
+        
+        tool = {
+            "name": func_name,
+            "description": description,
+            "inputSchema": { "json" : pydantic_to_json_schema(input_type) }
+        }
+        
+        tools.append({"toolSpec" : tool})
+
+    return tools
 
 # Print the resulting tools array
 # print("--------------------------------------------------------------------------------")
@@ -243,6 +373,11 @@ for func_name, func_info in function_io_map.items():
 # print(json.dumps(tools, indent=2))
 # print("--------------------------------------------------------------------------------")
 
+# Results of read-only tools are memoized per validated input. A tool opts in with
+# "cache": {"ttl": seconds, "max_entries": n}; a mutating tool lists the cached
+# tools it makes stale under "invalidates".
+tool_cache = ToolCache()
+
 def process_tool_call(tool_name, tool_input):
     if tool_name not in function_io_map:
         raise ValueError(f"Unknown tool: {tool_name}")
@@ -258,8 +393,29 @@ def process_tool_call(tool_name, tool_input):
     except ValidationError as e:
         return {"error": f"Invalid input: {str(e)}"}
 
+    cache_settings = func_info.get('cache')
+    if cache_settings is not None:
+        cache_key = validated_input.json()
+        hit, result = tool_cache.get(tool_name, cache_key)
+        if hit:
+            metrics.increment("tool_cache_hits_total", tool=tool_name)
+            return result
+        # A mutation that runs alongside this call bumps the generation and the
+        # result is then not cached (see ToolCache).
+        generation = tool_cache.generation(tool_name)
+
+    # Invalidate before and after, so entries cached while the mutation runs are cleared too
+    invalidates = func_info.get('invalidates', [])
+    tool_cache.invalidate(invalidates)
+
     # Call the function directly using the reference from function_io_map
-    result = function(validated_input)
+    with metrics.timer("tool_call_seconds", tool=tool_name):
+        result = function(validated_input)
+
+    tool_cache.invalidate(invalidates)
+    if cache_settings is not None:
+        tool_cache.put(tool_name, cache_key, result, cache_settings['ttl'], cache_settings['max_entries'],
+                       generation=generation)
 
     # Check if the result is of the expected output type
     #if not isinstance(result, output_model):
@@ -267,18 +423,270 @@ def process_tool_call(tool_name, tool_input):
 
     return result
 
+################################################################################
+## Running the tool calls of one response concurrently
+##
+## A tool's `timeout` bounds how long the model waits for it, not the call
+## itself: Python cannot interrupt a running thread, so a call that times out
+## keeps its worker until it returns and its result is then ignored. What ends
+## it is the tool's own I/O timeouts (HTTPClient's timeout and retries, the
+## GraphQL connection's execute_timeout), so those must stay finite and each
+## tool's `timeout` should be longer than them; otherwise hung calls would hold
+## all TOOL_MAX_WORKERS threads and starve later turns.
+
+TOOL_MAX_WORKERS = 4
+DEFAULT_TOOL_TIMEOUT_SECS = 30
+
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool")
+
+def tool_result_json(tool_result):
+    """Return the JSON content of a toolResult block for a tool's return value."""
+    if isinstance(tool_result, BaseModelWithCustomJSON):
+        return tool_result.to_jsonable()
+    if isinstance(tool_result, BaseModel):
+        return json.loads(tool_result.json())
+    return tool_result
+
+def submit_tool_call(tool_use):
+    """Start one toolUse block on `tool_executor`; returns (future, start time)."""
+    return tool_executor.submit(process_tool_call, tool_use['name'], tool_use['input']), time.monotonic()
+
+def failed_tool_call(error):
+    """A (future, start time) pair that fails with `error`, for a toolUse that cannot run."""
+    future = Future()
+    future.set_exception(error)
+    return future, time.monotonic()
+
+def run_tool_calls(tool_uses, started_calls=None):
+    """
+    Run toolUse blocks in parallel on `tool_executor` and return their toolResult
+    blocks in the same order as `tool_uses`.
+
+    `started_calls` maps toolUseId to the (future, start time) of calls that were
+    already submitted, e.g. while the response was still streaming.
+
+    Each tool gets the `timeout` from its function_io_map entry (default
+    DEFAULT_TOOL_TIMEOUT_SECS), counted from when it was submitted. A tool that
+    times out or raises is reported to the model as an error result. Calls that
+    have not started yet are cancelled on timeout or Ctrl-C; calls already
+    running are only abandoned and finish in the background (see above).
+    """
+    started_calls = started_calls or {}
+    calls = [started_calls.get(t['toolUseId']) or submit_tool_call(t) for t in tool_uses]
+
+    tool_results = []
+    try:
+        for tool_use, (future, started) in zip(tool_uses, calls):
+            timeout = function_io_map.get(tool_use['name'], {}).get('timeout', DEFAULT_TOOL_TIMEOUT_SECS)
+            tool_result = {"toolUseId": tool_use['toolUseId']}
+            outcome = "ok"
+            try:
+                content = tool_result_json(future.result(timeout=max(0, started + timeout - time.monotonic())))
+                if isinstance(content, dict) and "error" in content:
+                    outcome = "error"
+            except FutureTimeoutError:
+                if future.cancel():
+                    content = {"error": f"Tool {tool_use['name']} did not start within {timeout}s"}
+                else:
+                    content = {"error": f"Tool {tool_use['name']} timed out after {timeout}s; its result was discarded"}
+                tool_result["status"] = "error"
+                outcome = "timeout"
+            except Exception as e:
+                content = {"error": f"{type(e).__name__}: {e}"}
+                tool_result["status"] = "error"
+                outcome = "error"
+            metrics.increment("tool_calls_total", tool=tool_use['name'], outcome=outcome)
+            tool_result["content"] = [{"json": content}]
+            tool_results.append({"toolResult": tool_result})
+    except KeyboardInterrupt:
+        for future, _ in calls:
+            future.cancel()
+        raise
+
+    return tool_results
+
 ################################################################################
 ## Converse API
 
-client = boto3.client(
-    service_name='bedrock-runtime',
-    region_name='us-east-1'  # e.g., 'us-east-1'
-)
+@lazy
+def get_bedrock_client():
+    import boto3
+    return boto3.client(
+        service_name='bedrock-runtime',
+        region_name='us-east-1'  # e.g., 'us-east-1'
+    )
+
 MODEL_NAME= "anthropic.claude-3-5-sonnet-20240620-v1:0"
 
+# Render responses as they are generated (ConverseStream) rather than waiting for
+# the whole message. Set SBCT_STREAMING=0 to use the blocking Converse call.
+STREAMING = os.environ.get("SBCT_STREAMING", "1") != "0"
+
+# Mark the tool specs and the history prefix as cacheable (see PromptCache.py).
+# By default only for models known to support it; SBCT_PROMPT_CACHING=1 or 0
+# forces it on or off. Switched off for the session if the model still rejects
+# cache points.
+PROMPT_CACHING = {"1": True, "0": False}.get(os.environ.get("SBCT_PROMPT_CACHING", "auto"),
+                                             supports_caching(MODEL_NAME))
+
 console = Console()
 
+def converse(conversation_history):
+    """
+    Send the conversation to the model.
+
+    Returns:
+        (response, started_calls): `response` has the shape of a Converse response
+        (output.message.content, stopReason, usage). `started_calls` maps toolUseId
+        to the (future, start time) of tools already started while streaming, or
+        is None when not streaming.
+    """
+    global PROMPT_CACHING
+    try:
+        response, started_calls = send_converse(converse_request(conversation_history, PROMPT_CACHING))
+    except Exception as e:
+        if not (PROMPT_CACHING and caching_unsupported(e)):
+            raise
+        PROMPT_CACHING = False
+        console.print("[yellow]Prompt caching is not supported by this model; continuing without it.[/yellow]")
+        response, started_calls = send_converse(converse_request(conversation_history, False))
+    record_usage(response.get('usage'))
+    return response, started_calls
+
+@lazy
+def get_cached_tools():
+    return with_cache_point(get_tools())
+
+def converse_request(conversation_history, prompt_caching):
+    messages = inline_documents(conversation_history, get_blob_store())
+    if prompt_caching:
+        messages = add_history_cache_points(messages)
+    return dict(
+        modelId=MODEL_NAME,
+        inferenceConfig={"maxTokens" : 4096 }, 
+        toolConfig={ "tools" : get_cached_tools() if prompt_caching else get_tools()},
+        messages=messages
+    )
+
+def send_converse(request):
+    with metrics.timer("converse_seconds", mode="stream" if STREAMING else "sync"):
+        if not STREAMING:
+            return get_bedrock_client().converse(**request), None
+        return converse_stream(request)
+
+USAGE_TOKEN_TYPES = (("inputTokens", "input"), ("outputTokens", "output"),
+                     ("cacheReadInputTokens", "cache_read"), ("cacheWriteInputTokens", "cache_write"))
+
+def record_usage(usage):
+    """Add a Converse `usage` block to converse_tokens_total."""
+    for usage_key, token_type in USAGE_TOKEN_TYPES:
+        if usage and usage.get(usage_key):
+            metrics.increment("converse_tokens_total", usage[usage_key], type=token_type)
+
+def start_streamed_tool_use(tool_use):
+    """
+    Parse the JSON input streamed for a complete toolUse block and submit the call.
+
+    Input that is not a JSON object is replaced with {} (the history must hold an
+    object) and the call fails with an error result instead of running.
+    """
+    raw_input = tool_use['input']
+    try:
+        tool_input = json.loads(raw_input) if raw_input else {}
+    except ValueError as e:
+        tool_use['input'] = {}
+        return failed_tool_call(ValueError(f"Invalid JSON input for {tool_use['name']}: {e}"))
+    if not isinstance(tool_input, dict):
+        tool_use['input'] = {}
+        return failed_tool_call(ValueError(f"Input for {tool_use['name']} is not a JSON object: {raw_input}"))
+    tool_use['input'] = tool_input
+    return submit_tool_call(tool_use)
+
+def converse_stream(request):
+    """
+    Call ConverseStream and assemble the events into a Converse-shaped response.
+
+    Text deltas are rendered live in an "Agent response" panel. toolUse input
+    arrives as JSON fragments; once a toolUse block is complete it is parsed and
+    submitted to `tool_executor` straight away, before the rest of the message.
+    """
+    from rich.live import Live
+    from rich.markdown import Markdown
+
+    requested = time.perf_counter()
+    response = get_bedrock_client().converse_stream(**request)
+
+    first_block = True
+    blocks = {}  # contentBlockIndex -> block being assembled
+    started_calls = {}
+    stop_reason, usage = None, None
+    live = None
+    try:
+        for event in response['stream']:
+            if first_block and ('contentBlockStart' in event or 'contentBlockDelta' in event):
+                metrics.observe("converse_first_token_seconds", time.perf_counter() - requested)
+                first_block = False
+
+            if 'contentBlockStart' in event:
+                start = event['contentBlockStart']['start']
+                if 'toolUse' in start:
+                    blocks[event['contentBlockStart']['contentBlockIndex']] = {
+                        "toolUse": {**start['toolUse'], "input": ""}
+                    }
+
+            elif 'contentBlockDelta' in event:
+                index = event['contentBlockDelta']['contentBlockIndex']
+                delta = event['contentBlockDelta']['delta']
+                if 'text' in delta:
+                    block = blocks.setdefault(index, {"text": ""})
+                    block['text'] += delta['text']
+                    panel = Panel(Markdown(block['text']), title="Agent response", expand=False)
+                    if live is None:
+                        live = Live(panel, console=console, refresh_per_second=10)
+                        live.start()
+                    else:
+                        live.update(panel)
+                elif 'toolUse' in delta:
+                    blocks[index]['toolUse']['input'] += delta['toolUse']['input']
+
+            elif 'contentBlockStop' in event:
+                if live is not None:
+                    live.stop()
+                    live = None
+                block = blocks.get(event['contentBlockStop']['contentBlockIndex'])
+                if block is not None and 'toolUse' in block:
+                    tool_use = block['toolUse']
+                    started_calls[tool_use['toolUseId']] = start_streamed_tool_use(tool_use)
+
+            elif 'messageStop' in event:
+                stop_reason = event['messageStop']['stopReason']
+
+            elif 'metadata' in event:
+                usage = event['metadata'].get('usage')
+    finally:
+        if live is not None:
+            live.stop()
+
+    # A toolUse block without a contentBlockStop (the stream ended early, or the
+    # message hit max_tokens) still has its raw input; it is not run, but answered
+    # with an error result so every toolUse in the history has its toolResult.
+    for block in blocks.values():
+        if 'toolUse' in block and isinstance(block['toolUse']['input'], str):
+            tool_use = block['toolUse']
+            tool_use['input'] = {}
+            started_calls[tool_use['toolUseId']] = failed_tool_call(
+                ValueError(f"Tool input for {tool_use['name']} was cut off before it was complete"))
+
+    content = [blocks[index] for index in sorted(blocks)]
+    return {
+        "output": {"message": {"role": "assistant", "content": content}},
+        "stopReason": stop_reason,
+        "usage": usage,
+    }, started_calls
+
 def print_function_io_map(function_io_map):
+    from rich.table import Table
+    from rich.text import Text
     console = Console()
     table = Table(title="Function I/O Map", show_header=True, header_style="bold magenta")
     table.add_column("Function Name", style="cyan", no_wrap=True)
@@ -296,60 +704,79 @@ def print_function_io_map(function_io_map):
 
     console.print(Panel(table, expand=False, border_style="red"))
 
-def handle_response_list(response_content, conversation_history, debug=False):
+def handle_response_list(response_content, conversation_history, debug=False, started_calls=None):
     """
-    Print out the response, processing a tool call and adding it to the history if necessary.
+    Print out the response, processing the tool calls and adding their results to the history if necessary.
 
-    TODO Fix - this needs to be a list.
-    It needs to build up a user response for each tool_use_block
+    All toolUse blocks of one response run concurrently (see run_tool_calls); their
+    toolResult blocks are appended in the order the model asked for them.
+    With `started_calls` (from a streamed response) the text was already rendered
+    live and some tools may already be running.
     """
-    used_tools_flag = False
-    tool_use_element = {
-        "role" : "user",
-        "content" : []
-    }
+    from rich.markdown import Markdown
+    tool_uses = []
 
     for r0 in response_content:
         # console.print(Panel(json.dumps(r0, indent=2), title="r0", expand=False))
 
         # Handle TextBlock and ToolUseBlock specially
         if 'text' in r0.keys():
-            console.print(Panel(Markdown(str(r0['text'])), title="Agent response", expand=False))
+            if started_calls is None:
+                console.print(Panel(Markdown(str(r0['text'])), title="Agent response", expand=False))
         elif 'toolUse' in r0.keys():
-            used_tools_flag = True
-            tool_use_id = r0['toolUse']['toolUseId']
-            tool_name  = r0['toolUse']['name']
-            tool_input = r0['toolUse']['input']
+            tool_uses.append(r0['toolUse'])
             if debug:
-                console.print(f"\n[bold magenta]Tool Used:[/bold magenta] {tool_name}")
-                console.print(Panel(json.dumps(tool_input, indent=2), title="Tool Input", expand=False))
-                console.print(f"\n[bold magenta]...calling tool [/bold magenta] {tool_name}")
-
-            tool_result = process_tool_call(tool_name, tool_input)
-            if debug:
-                console.print("Trying to dump tool_result")
-                console.print(Panel(json.dumps(tool_result, indent=2), title="Tool Result", expand=False))
-
-            # Add the assistant's response and tool use to the conversation history
-            tool_use_element['content'].append(
-                {
-                    "toolResult" : {
-                        "toolUseId": tool_use_id,
-                        "content": [{"json" : json.loads(tool_result.json())}]
-                    }
-                }
-            )
+                console.print(f"\n[bold magenta]Tool Used:[/bold magenta] {r0['toolUse']['name']}")
+                console.print(Panel(json.dumps(r0['toolUse']['input'], indent=2), title="Tool Input", expand=False))
 
         else: ## Block type that we do not understand
             console.print(f"\n[bold orange]Different block type")
             console.print(Panel(str(r0)))
 
-    if used_tools_flag:
-        conversation_history.append(tool_use_element)
+    if tool_uses:
+        if debug:
+            console.print(f"\n[bold magenta]...calling tools [/bold magenta] {', '.join(t['name'] for t in tool_uses)}")
+
+        tool_results = run_tool_calls(tool_uses, started_calls)
+        if debug:
+            for tool_result in tool_results:
+                console.print(Panel(json.dumps(tool_result['toolResult'], indent=2), title="Tool Result", expand=False))
+
+        # Add the tool results to the conversation history as the next user turn
+        conversation_history.append({"role": "user", "content": tool_results})
 
     return conversation_history
     
 
+################################################################################
+## History budget
+##
+## Before each user turn is sent, the history is checked against a token budget
+## and the oldest turns are summarized (or dropped) once it is exceeded.
+## SBCT_HISTORY_COMPACTION is "summarize", "drop" or "off".
+
+HISTORY_BUDGET_TOKENS = int(os.environ.get("SBCT_HISTORY_BUDGET_TOKENS", "60000"))
+HISTORY_COMPACTION = os.environ.get("SBCT_HISTORY_COMPACTION", "summarize")
+COMPACTION_VERBS = {"summarize": "summarized", "drop": "dropped"}
+
+SUMMARY_PROMPT = ("Summarize the following earlier part of our conversation so it can replace it. "
+                  "Keep every decision, task, ID, date and open question; be concise.\n\n")
+
+def summarize_messages(messages):
+    from HistoryManager import render_for_summary
+    response = get_bedrock_client().converse(
+        modelId=MODEL_NAME,
+        inferenceConfig={"maxTokens" : 1024 },
+        messages=[{"role": "user", "content": [{"text": SUMMARY_PROMPT + render_for_summary(messages)}]}]
+    )
+    return "".join(block.get('text', '') for block in response['output']['message']['content'])
+
+@lazy
+def get_history_manager():
+    from HistoryManager import HistoryManager
+    summarize = summarize_messages if HISTORY_COMPACTION == "summarize" else None
+    return HistoryManager(HISTORY_BUDGET_TOKENS, summarize=summarize)
+
 def chatbot_interaction(user_message, conversation_history, debug=False):
 
     console.print(Panel(f"[bold blue]User Message:[/bold blue] {user_message}", expand=False))
@@ -357,14 +784,17 @@ def chatbot_interaction(user_message, conversation_history, debug=False):
     # Add the new user message to the conversation history and ask the question
     conversation_history.append(user_message)
 
-    response = client.converse(
-        modelId=MODEL_NAME,
-        inferenceConfig={"maxTokens" : 4096 }, 
-        toolConfig={ "tools" : tools},
-        messages=conversation_history
-    )
-    
+    if HISTORY_COMPACTION != "off":
+        compacted = get_history_manager().compact(conversation_history)
+        if compacted is not conversation_history:
+            console.print(f"[yellow]History over {HISTORY_BUDGET_TOKENS} tokens: "
+                          f"{len(conversation_history) - len(compacted)} older messages {COMPACTION_VERBS.get(HISTORY_COMPACTION, 'dropped')}.[/yellow]")
+            conversation_history = compacted
+
     console.print("\n[bold green]Initial Response:[/bold green]")
+    response, started_calls = converse(conversation_history)
+    round_trips = 1
+
     # console.print(str(response))
     # resp_type_list = [str(type(x)) for x in response['output']['message']['content']]
     # console.print(f"\n[bold green]{str(resp_type_list)}[/bold green]")
@@ -378,20 +808,16 @@ def chatbot_interaction(user_message, conversation_history, debug=False):
     if response['stopReason'] == 'tool_use':
         while response['stopReason'] == 'tool_use':
 
-            conversation_history = handle_response_list(response['output']['message']['content'], conversation_history, debug=debug)
+            conversation_history = handle_response_list(response['output']['message']['content'], conversation_history, debug=debug,
+                                                        started_calls=started_calls)
 
             
             # console.print("Into R2: ")
             # console.print(str(conversation_history))
             ## We we are using a tool, we need to follow up.
-            response2 = client.converse(
-                modelId=MODEL_NAME,
-                inferenceConfig={"maxTokens" : 4096 }, 
-                toolConfig={ "tools" : tools},
-                messages=conversation_history
-
-            )
             console.print("\n[bold green]Tool Follow-up Response:[/bold green]")
+            response2, started_calls = converse(conversation_history)
+            round_trips += 1
             console.print(f"[yellow]Stop Reason:[/yellow] {response2['stopReason']}")
 
             # Add the final assistant's response to the conversation history
@@ -401,14 +827,17 @@ def chatbot_interaction(user_message, conversation_history, debug=False):
             response = response2
 
         ## Finally, once I have excited the while loop, inject the last thing into the history
-        conversation_history = handle_response_list(response['output']['message']['content'], conversation_history, debug=debug)
+        conversation_history = handle_response_list(response['output']['message']['content'], conversation_history, debug=debug,
+                                                    started_calls=started_calls)
         
     else: ## For some other stop reason. This handles that we haven't even gone into the tool_use
           ## while loop
         console.print(f"[yellow]Stop Reason (else):[/yellow] {response['stopReason']}")
         # console.print(Panel(Markdown(str(response.content)), title="Content", expand=False))
-        conversation_history = handle_response_list(response['output']['message']['content'], conversation_history, debug=debug)
+        conversation_history = handle_response_list(response['output']['message']['content'], conversation_history, debug=debug,
+                                                    started_calls=started_calls)
             
+    metrics.observe("converse_round_trips", round_trips, buckets=COUNT_BUCKETS)
     return None , conversation_history
 
 def prompt_continuation(width, line_number, wrap_count):
@@ -425,6 +854,7 @@ def prompt_continuation(width, line_number, wrap_count):
     if wrap_count > 0:
         return " " * (width - 3) + "-> "
     else:
+        from prompt_toolkit.formatted_text import HTML
         text = ("- %i - " % (line_number + 1)).rjust(width)
         return HTML("<strong>%s</strong>") % text
 
@@ -434,6 +864,7 @@ def prompt_continuation_dots(width, line_number, is_soft_wrap):
 
 
 def multiline_input(prompt_text):
+    from prompt_toolkit import prompt
     console.print(prompt_text)
     answer = prompt(
         "Multiline input: ", multiline=True, prompt_continuation=prompt_continuation_dots
@@ -443,40 +874,24 @@ def multiline_input(prompt_text):
 ################################################################################
 ## Read file as document
 
+@lazy
+def get_document_loader():
+    from DocumentLoader import DocumentLoader
+    return DocumentLoader()
+
+@lazy
+def get_blob_store():
+    from BlobStore import BlobStore
+    return BlobStore()
+
 def read_file_as_document(file_path):
     """
     Read a file and return a document object suitable for the model.
-    """
-    if not os.path.exists(file_path):
-        return None, f"File not found: {file_path}"
 
-    file_name = os.path.basename(file_path)
-    _, file_extension = os.path.splitext(file_name)
-    file_extension = file_extension.lower()
-
-    format_mapping = {
-        '.pdf': 'pdf',
-        '.txt': 'txt',
-        '.md': 'md',
-        '.html': 'html'
-    }
-
-    if file_extension not in format_mapping:
-        return None, f"Unsupported file format: {file_extension}"
-
-    format = format_mapping[file_extension]
-
-    with open(file_path, 'rb') as file:
-        file_content = file.read()
-        encoded_content = base64.b64encode(file_content).decode('utf-8')
-
-    document = {
-        "name": file_name,
-        "format": format,
-        "source": {"bytes": encoded_content}
-    }
-
-    return document, None
+    Files over SBCT_MAX_DOCUMENT_BYTES are refused; see DocumentLoader.py. The
+    content goes to the BlobStore and the document only references it.
+    """
+    return get_document_loader().load(file_path, blob_store=get_blob_store())
 
 ################################################################################
 ## SESSION LOGIC
@@ -485,57 +900,145 @@ def generate_session_id():
     return str(uuid.uuid4())
 
 
-def ensure_saved_sessions_folder():
-    if not os.path.exists("saved_sessions"):
-        os.makedirs("saved_sessions")
+SESSIONS_PAGE_SIZE = 10
 
-def load_sessions():
-    ensure_saved_sessions_folder()
-    sessions = {}
-    for filename in os.listdir("saved_sessions"):
-        if filename.endswith(".pickle") and filename.startswith("session_"):
-            session_id = filename[8:-7]  # Remove "session_" prefix and ".pickle" suffix
-            with open(os.path.join("saved_sessions", filename), "rb") as f:
-                session_data = pickle.load(f)
-            sessions[session_id] = session_data
-    return sessions
+@lazy
+def get_session_store():
+    from SessionStore import SessionStore
+    return SessionStore(compress=os.environ.get("SBCT_COMPRESS_SESSIONS") == "1")
 
 def save_session(session_id, conversation_history):
-    ensure_saved_sessions_folder()
-    filename = os.path.join("saved_sessions", f"session_{session_id}.pickle")
-    session_data = {
-        "session_id": session_id,
-        "conversation_history": conversation_history,
-        "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    with open(filename, "wb") as f:
-        pickle.dump(session_data, f)
+    get_session_store().save(session_id, conversation_history)
     console.print(f"[bold green]Session saved: {session_id}[/bold green]")
 
 
-def choose_session(sessions):
-    console.print("[bold cyan]Available sessions:[/bold cyan]")
-    for i, (session_id, session_data) in enumerate(sessions.items(), 1):
-        console.print(f"{i}. Session {session_id[:8]}... (Last updated: {session_data.get('last_updated', 'Unknown')})")
-    
+def choose_session(store):
+    """
+    Page through saved sessions, newest first, and return the chosen session ID
+    (or None to start a new session). Only the index is read here.
+    """
+    offset, search = 0, None
     while True:
-        try:
-            choice = int(input("Enter the number of your choice (or 0 to start a new session): "))
-            if choice == 0:
+        total = store.count(search)
+        page = store.list_sessions(limit=SESSIONS_PAGE_SIZE, offset=offset, search=search)
+
+        heading = f"matching '{search}'" if search else "available"
+        console.print(f"[bold cyan]Sessions {heading} ({offset + 1}-{offset + len(page)} of {total}):[/bold cyan]")
+        for i, info in enumerate(page, 1):
+            console.print(f"{i}. {info['title'] or 'Session ' + info['session_id'][:8] + '...'} "
+                          f"({info['turn_count']} turns, last updated: {info['last_updated'] or 'Unknown'})")
+
+        choice = input("Number to load, 0 for a new session, n/p for next/previous page, /text to search: ").strip()
+        if choice == "n" and offset + SESSIONS_PAGE_SIZE < total:
+            offset += SESSIONS_PAGE_SIZE
+        elif choice == "p":
+            offset = max(0, offset - SESSIONS_PAGE_SIZE)
+        elif choice.startswith("/"):
+            search, offset = choice[1:].strip() or None, 0
+        else:
+            try:
+                number = int(choice)
+            except ValueError:
+                console.print("[bold red]Please enter a number, n, p or /text.[/bold red]")
+                continue
+            if number == 0:
                 return None  # Indicate that a new session should be created
-            elif 1 <= choice <= len(sessions):
-                return list(sessions.keys())[choice - 1]
+            elif 1 <= number <= len(page):
+                return page[number - 1]['session_id']
             else:
                 console.print("[bold red]Invalid choice. Please try again.[/bold red]")
-        except ValueError:
-            console.print("[bold red]Please enter a number.[/bold red]")
+
+################################################################################
+## Startup report
+
+def print_stats(fmt=""):
+    """
+    `/stats`: tool, GraphQL and Converse timings and token counts so far.
+    `/stats json` and `/stats prom` print the raw snapshot instead.
+    """
+    if fmt == "json":
+        print(metrics.to_json(indent=2))
+        return
+    if fmt == "prom":
+        print(metrics.to_prometheus(), end="")
+        return
+
+    snapshot = metrics.snapshot()
+    if not snapshot["histograms"] and not snapshot["counters"]:
+        console.print("[yellow]No metrics recorded yet.[/yellow]")
+        return
+    for name, series in snapshot["histograms"].items():
+        in_seconds = name.endswith("_seconds")
+        unit = "ms" if in_seconds else ""
+        console.print(f"[bold cyan]{name}[/bold cyan]")
+        for entry in series:
+            scale = 1000 if in_seconds else 1
+            labels = ", ".join(f"{key}={value}" for key, value in entry["labels"].items()) or "-"
+            console.print(f"  {labels:<40} n={entry['count']:<5} "
+                          f"p50={entry['p50'] * scale:.1f}{unit} p90={entry['p90'] * scale:.1f}{unit} "
+                          f"p99={entry['p99'] * scale:.1f}{unit} mean={entry['mean'] * scale:.1f}{unit}")
+    for name, series in snapshot["counters"].items():
+        console.print(f"[bold cyan]{name}[/bold cyan]")
+        for entry in series:
+            labels = ", ".join(f"{key}={value}" for key, value in entry["labels"].items()) or "-"
+            console.print(f"  {labels:<40} {entry['value']:g}")
+
+    tokens = {entry["labels"]["type"]: entry["value"] for entry in snapshot["counters"].get("converse_tokens_total", [])}
+    hit_ratio = cache_hit_ratio(tokens.get("input", 0), tokens.get("cache_read", 0), tokens.get("cache_write", 0))
+    if hit_ratio is not None and (tokens.get("cache_read") or tokens.get("cache_write")):
+        console.print(f"[bold cyan]prompt cache[/bold cyan]: {hit_ratio:.0%} of prompt tokens read from the cache")
+
+def print_startup_report(top=15):
+    """
+    Print where startup time goes: a per-package import-time breakdown of
+    `import sbctcli` (measured in a fresh interpreter with -X importtime),
+    followed by the first-use cost of each lazily created resource.
+    """
+    command = [sys.executable, "-X", "importtime", "-c", "import sbctcli"]
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(command, cwd=here, capture_output=True, text=True)
+
+    # Lines look like "import time: self [us] | cumulative | <indent>package"; a
+    # package's nested imports are listed (one indent deeper) before it.
+    total_ms, breakdown, pending = 0.0, [], []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            pending.append((int(cumulative) / 1000, name.strip()))
+        elif depth == 0:
+            if name.strip() == "sbctcli":
+                total_ms, breakdown = int(cumulative) / 1000, pending
+            pending = []
+
+    console.print(f"[bold cyan]import sbctcli: {total_ms:.0f} ms (budget {STARTUP_BUDGET_MS:.0f} ms)[/bold cyan]")
+    for ms, name in sorted(breakdown, reverse=True)[:top]:
+        console.print(f"  {ms:8.1f} ms  {name}")
+
+    console.print("[bold cyan]First-use cost of lazy resources:[/bold cyan]")
+    for factory in (get_tools, get_connection, get_task_client, get_okr_client, get_todo_client, get_bedrock_client):
+        factory()
+    for name, ms in startup_timings.items():
+        console.print(f"  {ms:8.1f} ms  {name}")
+
+    if total_ms > STARTUP_BUDGET_MS:
+        console.print("[bold red]Startup is over budget.[/bold red]")
+        return 1
+    return 0
 
 def main():
     console.print("[bold cyan]Welcome to the Task Management System![/bold cyan]")
 
-    sessions = load_sessions()
+    startup_ms = (time.perf_counter() - _process_start) * 1000
+    if startup_ms > STARTUP_BUDGET_MS:
+        console.print(f"[yellow]Startup took {startup_ms:.0f} ms (budget {STARTUP_BUDGET_MS:.0f} ms); "
+                      f"run with --startup-report for a breakdown.[/yellow]")
+
+    store = get_session_store()
     
-    if sessions:
+    if store.count():
         console.print("[bold yellow]Do you want to load an existing session or create a new one?[/bold yellow]")
         console.print("1. Load an existing session")
         console.print("2. Create a new session")
@@ -543,13 +1046,13 @@ def main():
         while True:
             choice = input("Enter your choice (1 or 2): ")
             if choice == "1":
-                session_id = choose_session(sessions)
+                session_id = choose_session(store)
                 if session_id is None:
                     session_id = generate_session_id()
                     conversation_history = []
                     console.print(f"[bold green]Created new session: {session_id}[/bold green]")
                 else:
-                    conversation_history = sessions[session_id]["conversation_history"]
+                    conversation_history = externalize_documents(store.load_history(session_id), get_blob_store())
                     console.print(f"[bold green]Loaded existing session: {session_id}[/bold green]")
                 break
             elif choice == "2":
@@ -579,6 +1082,15 @@ def main():
             save_session(session_id, conversation_history)
             break
         
+        if user_input.lower() == '/cache':
+            for name, counts in tool_cache.stats().items():
+                console.print(f"  [cyan]{name}[/cyan]: {counts['hits']} hits, {counts['misses']} misses, {counts['entries']} cached")
+            continue
+
+        if user_input.lower().startswith('/stats'):
+            print_stats(user_input.split()[1] if len(user_input.split()) > 1 else "")
+            continue
+
         if user_input.lower() == '/s':
             console.print("[bold cyan]Summarizing session state and updating the history![/bold cyan]")
             user_input = "If I am in the state where I am planning social media posts, please generate a table of what I am working on and a list of the tasks created so far. Otherwise, write a summary of what I have been doing in this session. I am about to clear the contents."
@@ -620,5 +1132,23 @@ def main():
 
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Task Management System chat agent.")
+    parser.add_argument("--startup-report", action="store_true", help="Print an import-time breakdown and exit")
+    parser.add_argument("--prune-sessions", type=int, metavar="DAYS", help="Delete sessions not updated in DAYS days and exit")
+    parser.add_argument("--keep-latest", type=int, default=None, help="With --prune-sessions, always keep this many recent sessions")
+    parser.add_argument("--convert-sessions", action="store_true", help="Convert pickled sessions to journals and exit")
+    args = parser.parse_args()
+
+    if args.startup_report:
+        sys.exit(print_startup_report())
+    if args.prune_sessions is not None:
+        removed = get_session_store().prune(older_than_days=args.prune_sessions, keep_latest=args.keep_latest)
+        console.print(f"[bold green]Pruned {removed} sessions.[/bold green]")
+        sys.exit(0)
+    if args.convert_sessions:
+        converted = get_session_store().convert_pickles()
+        console.print(f"[bold green]Converted {converted} sessions.[/bold green]")
+        sys.exit(0)
     main()
 
@@ -0,0 +1,69 @@
+from HistoryManager import HistoryManager, estimate_block_tokens, MAX_DOCUMENT_TOKENS
+
+
+def pdf_block(size, name="report.pdf"):
+    return {"document": {"name": name, "format": "pdf", "source": {"blobRef": "0" * 64, "size": size}}}
+
+
+def conversation(turns, first_content=()):
+    """`turns` user/assistant exchanges; the first user message also carries `first_content`."""
+    history = []
+    for turn in range(turns):
+        content = [{"text": f"question {turn}"}] + (list(first_content) if turn == 0 else [])
+        history.append({"role": "user", "content": content})
+        history.append({"role": "assistant", "content": [{"text": f"answer {turn} " * 20}]})
+    return history
+
+
+def test_pdf_is_estimated_by_page_and_capped():
+    assert estimate_block_tokens(pdf_block(800_000)) < 10_000
+    assert estimate_block_tokens(pdf_block(4_500_000)) == MAX_DOCUMENT_TOKENS
+
+
+def test_text_document_is_estimated_by_size():
+    block = {"document": {"name": "notes.txt", "format": "txt", "source": {"blobRef": "0" * 64, "size": 400_000}}}
+    assert estimate_block_tokens(block) == 100_001
+
+
+def test_attached_pdf_does_not_trigger_compaction():
+    history = conversation(6, [pdf_block(800_000)]) + [{"role": "user", "content": [{"text": "next"}]}]
+    assert len(history) == 13
+    calls = []
+    manager = HistoryManager(60_000, summarize=lambda removed: calls.append(removed) or "summary")
+
+    assert manager.compact(history) is history
+    assert calls == []
+
+
+def test_over_budget_history_is_compacted():
+    history = conversation(6) + [{"role": "user", "content": [{"text": "x" * 400_000}]}]
+    manager = HistoryManager(60_000, keep_recent_turns=1)
+
+    compacted = manager.compact(history)
+    assert compacted is not history
+    assert compacted[-1] is history[-1]
+
+
+def text_document(size):
+    return {"document": {"name": "notes.txt", "format": "txt", "source": {"blobRef": "0" * 64, "size": size}}}
+
+
+def test_only_documents_that_are_still_sent_are_counted():
+    manager = HistoryManager(60_000, document_keep_turns=3)
+    recent = conversation(3, [text_document(400_000)])
+    assert manager.compact(recent) is not recent
+
+    old = conversation(4, [text_document(400_000)])  # Four turns back: sent as a note
+    assert manager.total_tokens(old) < 2_000
+    assert manager.compact(old) is old
+
+
+def test_document_stays_while_the_inline_policy_keeps_it():
+    history = conversation(6, [pdf_block(800_000)])
+    manager = HistoryManager(60_000, summarize=lambda removed: "summary")
+    for follow_up in range(3):
+        history.append({"role": "user", "content": [{"text": f"follow-up {follow_up}"}]})
+        history = manager.compact(history)
+        history.append({"role": "assistant", "content": [{"text": "ok"}]})
+    assert len(history) == 18
+    assert any("document" in block for block in history[0]["content"])
@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from HTTPClient import HTTPClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so connection reuse can be observed
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        status, headers, body, delay = self.server.responses.pop(0) if self.server.responses else self.server.default
+        if delay:
+            time.sleep(delay)
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    httpd.daemon_threads = True
+    httpd.handle_error = lambda request, client_address: None  # e.g. the client gave up on a slow response
+    httpd.connections = 0
+    httpd.requests = []
+    httpd.responses = []  # (status, headers, body, delay) served in order, then `default`
+    httpd.default = (200, {}, {"ok": True}, 0)
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/data"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def client():
+    client = HTTPClient(timeout=(1, 2))
+    yield client
+    client.close()
+
+
+def test_ttl_hit_is_served_from_memory(server, client):
+    server.default = (200, {}, {"n": 1}, 0)
+    assert client.get_json(server.url, ttl=60) == {"n": 1}
+    assert client.get_json(server.url, ttl=60) == {"n": 1}
+    assert len(server.requests) == 1
+
+
+def test_expired_entry_is_revalidated_with_etag(server, client):
+    server.responses = [(200, {"ETag": '"v1"'}, {"n": 1}, 0),
+                        (304, {}, None, 0)]
+    assert client.get_json(server.url, ttl=0.05) == {"n": 1}
+    time.sleep(0.1)
+    assert client.get_json(server.url, ttl=0.05) == {"n": 1}
+    assert len(server.requests) == 2
+    assert server.requests[1]["If-None-Match"] == '"v1"'
+
+
+def test_503_is_retried(server, client):
+    server.responses = [(503, {}, {"error": "busy"}, 0)]
+    server.default = (200, {}, {"n": 2}, 0)
+    assert client.get_json(server.url) == {"n": 2}
+    assert len(server.requests) == 2
+
+
+def test_connection_is_reused(server, client):
+    for _ in range(5):
+        client.get_json(server.url)
+    assert len(server.requests) == 5
+    assert server.connections == 1
+
+
+def test_read_timeout_is_not_retried(server):
+    client = HTTPClient(timeout=(1, 0.2))
+    server.responses = [(200, {}, {"n": 1}, 0.5)]
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.get_json(server.url)
+    client.close()
+    assert len(server.requests) == 1
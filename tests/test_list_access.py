@@ -0,0 +1,70 @@
+import pytest
+
+from GraphQLSession import GraphQLConnection
+from LocalAppSync import LocalAppSync, SCHEMA_FILE
+from LocalReplica import Replica
+from OKRAccess import OKR, OKR_LIST
+from PydanticTaskModels import NullModel, OKRTitle, TaskName, TaskOut
+from TaskAccess import Task, TASK_LIST
+
+
+@pytest.fixture
+def server():
+    with LocalAppSync().seed(tasks=5, okrs=3) as server:
+        yield server
+
+
+@pytest.fixture
+def connection(server):
+    connection = GraphQLConnection(server.endpoint, "local", schema_file=SCHEMA_FILE)
+    yield connection
+    connection.shutdown()
+
+
+def test_projection_documents_select_only_projected_fields():
+    assert TASK_LIST.document(TaskOut) is TASK_LIST.full_document
+    assert TASK_LIST.document(TaskName) is TASK_LIST.document(TaskName)
+    assert "description" not in TASK_LIST.document(TaskName).text
+    assert "description" not in OKR_LIST.document(OKRTitle).text
+    assert "listOKRS" in OKR_LIST.document(OKRTitle).text
+    with pytest.raises(ValueError):
+        OKR_LIST.document(TaskName)
+
+
+@pytest.mark.parametrize("table", ["tasks", "okrs"])
+def test_replica_sync_drops_records_deleted_elsewhere(server, connection, tmp_path, table):
+    replica = Replica(str(tmp_path / "replica.sqlite3"), table)
+    if table == "tasks":
+        access = Task(connection, replica=replica, sync_interval=0, full_sync_interval=0)
+        count = lambda: len(access.list_tasks().tasks)
+    else:
+        access = OKR(connection, replica=replica, sync_interval=0, full_sync_interval=0)
+        count = lambda: len(access.list_okrs(NullModel()).okrs)
+
+    before = count()
+    server.tables[table].pop(next(iter(server.tables[table])))
+    assert count() == before - 1
+
+
+def test_projection_skips_a_cold_replica(server, connection, tmp_path):
+    replica = Replica(str(tmp_path / "replica.sqlite3"), "tasks")
+    tasks = Task(connection, replica=replica)
+
+    bytes_before = server.query_bytes
+    names = tasks.list_task_names().tasks
+    assert len(names) == 5
+    assert replica.high_water_mark() is None  # No full sync for a projection
+    assert server.query_bytes - bytes_before == len(TASK_LIST.document(TaskName).text)
+
+    assert len(tasks.list_tasks().tasks) == 5  # Fills the replica
+    requests_before = server.request_count
+    assert [task.id for task in tasks.list_task_names().tasks] == [task.id for task in names]
+    assert server.request_count == requests_before  # Served from the warm replica
+
+
+def test_okr_projection_skips_a_cold_replica(server, connection, tmp_path):
+    replica = Replica(str(tmp_path / "replica.sqlite3"), "okrs")
+    okrs = OKR(connection, replica=replica)
+
+    assert len(okrs.list_okr_titles(NullModel()).okrs) == 3
+    assert replica.high_water_mark() is None
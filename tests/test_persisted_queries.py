@@ -0,0 +1,93 @@
+import importlib
+
+import pytest
+
+import GraphQLSession
+from GraphQLSession import GraphQLConnection
+from LocalAppSync import LocalAppSync, SCHEMA_FILE
+from TaskAccess import LIST_TASKS
+
+
+@pytest.fixture
+def connect():
+    """Start a LocalAppSync and return connections to it; both are closed afterwards."""
+    servers, connections = [], []
+
+    def connect(server_persisted_queries=True, connection_class=None, **kwargs):
+        server = LocalAppSync(persisted_queries=server_persisted_queries).seed(tasks=3).start()
+        servers.append(server)
+        connection = (connection_class or GraphQLConnection)(server.endpoint, "local", schema_file=SCHEMA_FILE, **kwargs)
+        connections.append(connection)
+        return server, connection
+
+    yield connect
+    for connection in connections:
+        connection.shutdown()
+    for server in servers:
+        server.stop()
+
+
+def list_tasks(connection):
+    return connection.run(connection.execute(LIST_TASKS, {"limit": 10}))["listTasks"]["items"]
+
+
+def test_registered_hash_is_sent_without_text(connect):
+    server, connection = connect(persisted_queries=True)
+    server.persisted[LIST_TASKS.sha256] = LIST_TASKS.text
+
+    assert len(list_tasks(connection)) == 3
+    assert server.request_count == 1
+    assert server.query_bytes == 0
+
+
+def test_unknown_hash_is_retried_with_text(connect):
+    server, connection = connect(persisted_queries=True)
+
+    assert len(list_tasks(connection)) == 3
+    assert server.request_count == 2  # The hash, then the hash with the text
+    assert server.query_bytes == len(LIST_TASKS.text)
+    assert server.persisted == {LIST_TASKS.sha256: LIST_TASKS.text}
+
+    assert len(list_tasks(connection)) == 3
+    assert server.request_count == 3
+    assert server.query_bytes == len(LIST_TASKS.text)
+
+
+def test_detection_without_server_support_falls_back_to_text(connect):
+    server, connection = connect(server_persisted_queries=False, persisted_queries=None)
+
+    assert len(list_tasks(connection)) == 3
+    assert connection.persisted_queries is False
+    assert server.persisted == {}
+
+    requests_before, bytes_before = server.request_count, server.query_bytes
+    assert len(list_tasks(connection)) == 3
+    assert server.request_count == requests_before + 1
+    assert server.query_bytes == bytes_before + len(LIST_TASKS.text)
+
+
+def test_detection_with_server_support_switches_to_hashes(connect):
+    server, connection = connect(persisted_queries=None)
+
+    list_tasks(connection)
+    assert connection.persisted_queries is True
+
+    bytes_before = server.query_bytes
+    list_tasks(connection)
+    assert server.query_bytes == bytes_before
+
+
+def test_environment_off_sends_full_text(connect, monkeypatch):
+    monkeypatch.setenv("BOSBCT_PERSISTED_QUERIES", "off")
+    try:
+        session_module = importlib.reload(GraphQLSession)
+        assert session_module.PERSISTED_QUERIES is False
+        server, connection = connect(connection_class=session_module.GraphQLConnection)
+
+        assert len(list_tasks(connection)) == 3
+        assert server.request_count == 1
+        assert server.query_bytes == len(LIST_TASKS.text)
+        assert server.persisted == {}
+    finally:
+        monkeypatch.delenv("BOSBCT_PERSISTED_QUERIES")
+        importlib.reload(GraphQLSession)
@@ -0,0 +1,17 @@
+from PromptCache import CACHE_POINT, add_history_cache_points, supports_caching
+
+
+def test_caching_is_enabled_only_for_supported_models():
+    assert not supports_caching("anthropic.claude-3-5-sonnet-20240620-v1:0")
+    assert supports_caching("anthropic.claude-3-7-sonnet-20250219-v1:0")
+    assert supports_caching("us.anthropic.claude-sonnet-4-20250514-v1:0")
+    assert not supports_caching("us.anthropic.claude-3-5-sonnet-20240620-v1:0")
+
+
+def test_history_cache_points_do_not_modify_the_history():
+    messages = [{"role": "user", "content": [{"text": str(n)}]} for n in range(3)]
+    marked = add_history_cache_points(messages)
+    assert marked[-1]["content"][-1] == CACHE_POINT
+    assert marked[0]["content"][-1] == CACHE_POINT
+    assert marked[1] is messages[1]
+    assert all(CACHE_POINT not in message["content"] for message in messages)
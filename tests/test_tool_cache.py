@@ -0,0 +1,56 @@
+import os
+import threading
+
+os.environ.setdefault("BOSBCT_ENDPOINT", "http://127.0.0.1:1/graphql")
+os.environ.setdefault("BOSBCT_API_KEY", "test")
+
+import sbctcli
+from PydanticTaskModels import NullModel
+from ToolCache import ToolCache
+
+
+def test_put_after_invalidation_is_dropped():
+    cache = ToolCache()
+    generation = cache.generation("list")
+    cache.invalidate(["list"])
+    cache.put("list", "key", "stale", ttl=60, max_entries=1, generation=generation)
+    assert cache.get("list", "key") == (False, None)
+
+    cache.put("list", "key", "fresh", ttl=60, max_entries=1, generation=cache.generation("list"))
+    assert cache.get("list", "key") == (True, "fresh")
+
+
+def test_read_running_alongside_a_mutation_is_not_cached(monkeypatch):
+    items = ["a"]
+    snapshot_taken = threading.Event()
+    mutation_done = threading.Event()
+
+    def read(nm):
+        snapshot = list(items)
+        snapshot_taken.set()
+        mutation_done.wait(5)  # Return only after the mutation has invalidated the cache
+        return {"items": snapshot}
+
+    def write(nm):
+        snapshot_taken.wait(5)
+        items.append("b")
+        return {"ok": True}
+
+    monkeypatch.setattr(sbctcli, "tool_cache", ToolCache())
+    monkeypatch.setitem(sbctcli.function_io_map, "test_read", {
+        "input": NullModel, "output": NullModel, "description": "", "function": read,
+        "cache": {"ttl": 60, "max_entries": 1},
+    })
+    monkeypatch.setitem(sbctcli.function_io_map, "test_write", {
+        "input": NullModel, "output": NullModel, "description": "", "function": write,
+        "invalidates": ["test_read"],
+    })
+
+    read_call = sbctcli.submit_tool_call({"toolUseId": "1", "name": "test_read", "input": {}})
+    sbctcli.run_tool_calls([{"toolUseId": "2", "name": "test_write", "input": {}}])
+    mutation_done.set()
+    results = sbctcli.run_tool_calls([{"toolUseId": "1", "name": "test_read", "input": {}}],
+                                     {"1": read_call})
+    assert results[0]["toolResult"]["content"] == [{"json": {"items": ["a"]}}]
+
+    assert sbctcli.process_tool_call("test_read", {}) == {"items": ["a", "b"]}